@@ -75,11 +75,11 @@ class BackendBuilder:
                 raise ValueError(f'Parameter "{param.name}" is needed')
 
         try:
-            return self._backend_class(**self.init_params)
+            backend = self._backend_class(**self.init_params)
         except BackendError as e:
             raise ValueError(str(e))
-
-        backend.validate_setup(**self.setup_params)
+        # it was only made to check the params, it might have started processes
+        backend.close()
 
     def is_valid(self):
         try:
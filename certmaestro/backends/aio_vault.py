@@ -0,0 +1,209 @@
+"""
+    Non-blocking Vault backend for asyncio applications, every operation is a coroutine.
+    It is not offered by the command line interface, use it as a library:
+
+        async with Backend(url, token, 'pki', 'example-dot-com') as backend:
+            key, cert = await backend.issue_cert(csr)
+"""
+import json
+import asyncio
+from functools import partial
+from typing import AsyncIterator, Iterable
+import aiohttp
+from ..exceptions import BackendError
+from ..wrapper import Cert, PrivateKey, Crl, StreamingCrl, SerialNumber
+from ..config import Param
+from ..csr import CsrBuilder
+from .interfaces import IAsyncBackend, BatchResult
+from .vault import Backend as VaultBackend
+
+
+class Backend(IAsyncBackend):
+    name = 'Vault (asyncio)'
+    description = "Hashicorp's Vault with asyncio: https://www.vaultproject.io"
+    # many operations can run concurrently on one event loop, but the aiohttp session is bound
+    # to the loop it was opened on, so it can't be used from other threads
+    threadsafe = False
+
+    init_requires = (
+        Param('url', default='http://localhost:8200', help='URL of the Vault server'),
+        Param('token', help='Token for accessing Vault'),
+        Param('mount_point', default='pki', help="Mount point of the 'pki' secret backend"),
+        Param('role', help='Role issuing certificates'),
+        Param('pool_size', default=100, convert=int,
+              help='Maximum number of simultaneous connections to Vault'),
+        Param('timeout', default=30, convert=float, help='Request timeout (seconds)'),
+    )
+
+    get_csr_policy = VaultBackend.get_csr_policy
+    get_csr_defaults = VaultBackend.get_csr_defaults
+
+    def __init__(self, url: str, token: str, mount_point: str, role: str, pool_size: int=100,
+                 timeout: float=30):
+        if not url.startswith('http://') and not url.startswith('https://'):
+            raise BackendError('URL needs to start with http:// or https://')
+        self._url = url[:-1] if url.endswith('/') else url
+        self._token = token
+        # normalize mount_point to naked, so we can consistently use in strings
+        self.mount_point = mount_point[:-1] if mount_point.endswith('/') else mount_point
+        self.role = role
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._session = None
+
+    def __str__(self):
+        return f'<aio_vault.Backend: {self._url}>\n'
+
+    async def open(self):
+        """Create the connection pool and check the credentials.
+        It has to be called from a running event loop.
+        """
+        connector = aiohttp.TCPConnector(limit=self._pool_size)
+        self._session = aiohttp.ClientSession(
+            connector=connector, headers={'X-Vault-Token': self._token},
+            timeout=aiohttp.ClientTimeout(total=self._timeout))
+        try:
+            await self._request('GET', 'auth/token/lookup-self')
+        except BackendError:
+            await self.close()
+            raise
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method: str, path: str, params=None, **data):
+        if self._session is None:
+            raise BackendError('Backend is not opened, call open() first!')
+        url = f'{self._url}/v1/{path}'
+        try:
+            async with self._session.request(method, url, params=params,
+                                             json=data or None) as response:
+                text = await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise BackendError(f'Could not connect to Vault server: {e}') from e
+        try:
+            body = json.loads(text) if text else None
+        except ValueError:
+            # e.g. an error page from a proxy
+            body = None
+        if response.status == 403:
+            raise BackendError('Invalid connection credentials!')
+        if response.status >= 400:
+            errors = ', '.join((body or {}).get('errors', [])) or response.reason
+            raise BackendError(f'Vault error ({response.status}): {errors}')
+        return body
+
+    async def _read_cert(self, serial: str, header_only: bool=False) -> Cert:
+        serial_number = SerialNumber(serial)
+        res = await self._request('GET', f'{self.mount_point}/cert/{serial_number}')
+        return Cert(res['data']['certificate'], header_only=header_only)
+
+    async def get_ca_cert(self) -> Cert:
+        res = await self._request('GET', f'{self.mount_point}/cert/ca')
+        return Cert(res['data']['certificate'])
+
+    async def issue_cert(self, csr) -> (PrivateKey, Cert):
+        res = await self._request('POST', f'{self.mount_point}/issue/{self.role}',
+                                  common_name=csr['common_name'])
+        return PrivateKey(res['data']['private_key']), Cert(res['data']['certificate'])
+
+    async def revoke_cert(self, serial: str):
+        return await self._request('POST', f'{self.mount_point}/revoke',
+                                   serial_number=str(SerialNumber(serial)))
+
+    async def list_certs(self, workers: int=10, ordered: bool=True,
+                         cache=None) -> AsyncIterator[Cert]:
+        """Fetch at most workers certificates at the same time."""
+        # same as the LIST method, which is not supported by every HTTP server and proxy
+        res = await self._request('GET', f'{self.mount_point}/certs', params={'list': 'true'})
+        read_cert = partial(self._read_cert, header_only=True)
+        async for cert in _map_concurrently(read_cert, res['data']['keys'], workers, ordered):
+            yield cert
+
+    async def issue_certs(self, csrs: Iterable[CsrBuilder],
+                          workers: int=10) -> AsyncIterator[BatchResult]:
+        """Issue a certificate for every CSR, at most workers at the same time.
+        Results are yielded as soon as they are ready, a failing item doesn't stop the others.
+        """
+        async for result in _map_concurrently(self._issue_cert_result, csrs, workers,
+                                              ordered=False):
+            yield result
+
+    async def _issue_cert_result(self, csr: CsrBuilder) -> BatchResult:
+        try:
+            return BatchResult(csr, await self.issue_cert(csr))
+        except Exception as e:
+            return BatchResult(csr, error=e)
+
+    async def revoke_certs(self, serials: Iterable[str],
+                           workers: int=10) -> AsyncIterator[BatchResult]:
+        """Revoke every certificate, at most workers at the same time.
+        Results are yielded as soon as they are ready, a failing item doesn't stop the others.
+        """
+        async for result in _map_concurrently(self._revoke_cert_result, serials, workers,
+                                              ordered=False):
+            yield result
+
+    async def _revoke_cert_result(self, serial: str) -> BatchResult:
+        try:
+            return BatchResult(serial, await self.revoke_cert(serial))
+        except Exception as e:
+            return BatchResult(serial, error=e)
+
+    async def get_cert(self, serial: str) -> Cert:
+        return await self._read_cert(serial)
+
+    async def get_crl(self, streaming: bool=False) -> Crl:
+        res = await self._request('GET', f'{self.mount_point}/cert/crl')
+        if streaming:
+            return StreamingCrl.from_pem(res['data']['certificate'])
+        return Crl(res['data']['certificate'])
+
+    async def update_crl(self, delta: bool=False) -> Crl:
+        """Delta CRLs need Vault 1.12 or newer, see vault.Backend.update_crl."""
+        if delta:
+            await self._request('GET', f'{self.mount_point}/crl/rotate-delta')
+            res = await self._request('GET', f'{self.mount_point}/cert/delta-crl')
+        else:
+            await self._request('GET', f'{self.mount_point}/crl/rotate')
+            res = await self._request('GET', f'{self.mount_point}/cert/crl')
+        return Crl(res['data']['certificate'])
+
+    async def get_version(self) -> str:
+        health_data = await self._request('GET', 'sys/health')
+        return self.name + ' ' + health_data['version']
+
+
+async def _map_concurrently(coro_func, items: Iterable, workers: int,
+                            ordered: bool) -> AsyncIterator:
+    """Await coro_func for every item, at most workers at the same time,
+    and yield the results in the order of items or as soon as they are ready.
+    """
+    pending = []
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(coro_func(item)))
+            if len(pending) >= workers:
+                for result in await _pop_finished(pending, ordered):
+                    yield result
+        while pending:
+            for result in await _pop_finished(pending, ordered):
+                yield result
+    finally:
+        # when the caller stops iterating early
+        for future in pending:
+            future.cancel()
+
+
+async def _pop_finished(pending: list, ordered: bool):
+    """Wait for the first future if ordered, otherwise for any of them, remove the finished
+    ones from pending and return their results.
+    """
+    if ordered:
+        return [await pending.pop(0)]
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return [future.result() for future in done]
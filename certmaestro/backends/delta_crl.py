@@ -0,0 +1,170 @@
+"""
+    Delta CRLs (RFC 5280 5.2.4) for the CA configured in openssl.cnf. openssl ca can only
+    generate complete CRLs, so the delta CRL is built and signed here, from the revocations in
+    the database which are not in the last complete CRL or have a different reason there.
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Mapping
+import asn1crypto.crl as asn1crl
+import asn1crypto.pem as asn1pem
+import asn1crypto.x509 as asn1x509
+from oscrypto import asymmetric
+from ..exceptions import BackendError
+from ..locking import FileLock
+from ..wrapper import Crl
+from .signer import _read_hash_algo, _load_ca, _format_serial, _write_file
+
+
+# reasons in the OpenSSL database
+_CRL_REASONS = {
+    'unspecified': 'unspecified',
+    'keyCompromise': 'key_compromise',
+    'CACompromise': 'ca_compromise',
+    'affiliationChanged': 'affiliation_changed',
+    'superseded': 'superseded',
+    'cessationOfOperation': 'cessation_of_operation',
+    'certificateHold': 'certificate_hold',
+    'removeFromCRL': 'remove_from_crl',
+    # openssl ca -crl_compromise and -crl_CA_compromise
+    'keyTime': 'key_compromise',
+    'CAkeyTime': 'ca_compromise',
+}
+
+_SIGN_FUNCTIONS = {
+    'rsa': (asymmetric.rsa_pkcs1v15_sign, 'rsa'),
+    'ec': (asymmetric.ecdsa_sign, 'ecdsa'),
+    'dsa': (asymmetric.dsa_sign, 'dsa'),
+}
+
+
+class DeltaCrlGenerator:
+    """Generates delta CRLs with the crlnumber, default_crl_days, default_crl_hours and
+    default_md settings of the CA section. Delta CRLs and complete CRLs share the CRL numbers,
+    so the crlnumber file is updated the same way as openssl ca -gencrl does.
+    """
+
+    def __init__(self, ca_section: Mapping, root_dir: Path, db, lock: FileLock):
+        self._db = db
+        self._lock = lock
+        if 'crlnumber' not in ca_section:
+            raise BackendError('crlnumber is missing from the CA section, '
+                               'delta CRLs need numbered CRLs')
+        self._crl_number_path = root_dir / ca_section['crlnumber']
+
+        days = int(ca_section.get('default_crl_days', 0))
+        hours = int(ca_section.get('default_crl_hours', 0))
+        if not days and not hours:
+            raise BackendError('default_crl_days or default_crl_hours is missing from the '
+                               'CA section')
+        self._period = timedelta(days=days, hours=hours)
+
+        self._hash_algo = _read_hash_algo(ca_section)
+        self._ca_cert, self._ca_key = _load_ca(ca_section, root_dir)
+        if self._ca_key.algorithm not in _SIGN_FUNCTIONS:
+            raise BackendError(f'Unsupported CA key algorithm: {self._ca_key.algorithm}')
+
+    def generate(self, base_crl_path: Path, delta_crl_path: Path) -> Crl:
+        """Write the delta CRL of the complete CRL in base_crl_path and return it."""
+        # the complete CRL can't be replaced by openssl ca -gencrl while we are working with it
+        with self._lock:
+            try:
+                base_crl = Crl.from_file(base_crl_path)
+            except FileNotFoundError:
+                raise BackendError(f'There is no complete CRL ({base_crl_path}) yet, '
+                                   'update the CRL first')
+            if base_crl.crl_number is None:
+                raise BackendError('The complete CRL has no CRL number, set crlnumber in the '
+                                   'CA section and update the CRL')
+
+            revocations = self._read_revocations()
+            entries = []
+            for serial, (date, reason) in revocations.items():
+                revoked_cert = base_crl.revoked_index.get(serial)
+                if revoked_cert is None:
+                    entries.append((serial, date, reason))
+                    continue
+                # e.g. on hold in the complete CRL, and revoked for good since then
+                base_reason = revoked_cert.crl_reason_value
+                if (base_reason.native if base_reason is not None else None) != reason:
+                    entries.append((serial, date, reason))
+            # certificates which were on hold in the complete CRL and are valid again
+            for serial, revoked_cert in base_crl.revoked_index.items():
+                reason = revoked_cert.crl_reason_value
+                if serial not in revocations and reason is not None and \
+                        reason.native == 'certificate_hold':
+                    entries.append((serial, revoked_cert['revocation_date'].native,
+                                    'remove_from_crl'))
+            crl_number = self._take_crl_number()
+            crl = self._build(sorted(entries), crl_number, base_crl.crl_number)
+            crl_pem = asn1pem.armor('X509 CRL', crl.dump()).decode()
+            _write_file(delta_crl_path, crl_pem.encode())
+        return Crl.from_asn1(crl)
+
+    def _read_revocations(self) -> dict:
+        """Revocation date and reason of every revoked certificate by serial number."""
+        revocations = {}
+        for entry in self._db:
+            if entry.status != 'R':
+                continue
+            date, _, reason = entry.revocation.partition(',')
+            reason = reason.partition(',')[0]
+            date_format = '%y%m%d%H%M%SZ' if len(date) == 13 else '%Y%m%d%H%M%SZ'
+            date = datetime.strptime(date, date_format).replace(tzinfo=timezone.utc)
+            revocations[int(entry.serial_number)] = date, _CRL_REASONS.get(reason)
+        return revocations
+
+    def _take_crl_number(self) -> int:
+        try:
+            crl_number = int(self._crl_number_path.read_text().strip(), 16)
+        except FileNotFoundError:
+            raise BackendError(f'OpenSSL crlnumber file ({self._crl_number_path}) is missing.')
+        _write_file(self._crl_number_path, (_format_serial(crl_number + 1) + '\n').encode())
+        return crl_number
+
+    def _build(self, entries, crl_number: int, base_crl_number: int) -> asn1crl.CertificateList:
+        sign, signature_algo = _SIGN_FUNCTIONS[self._ca_key.algorithm]
+        signature_algorithm = {'algorithm': f'{self._hash_algo}_{signature_algo}'}
+        this_update = datetime.now(timezone.utc).replace(microsecond=0)
+
+        revoked_certificates = []
+        for serial, date, reason in entries:
+            revoked_cert = {'user_certificate': serial, 'revocation_date': _make_time(date)}
+            if reason is not None:
+                revoked_cert['crl_entry_extensions'] = [
+                    {'extn_id': 'crl_reason', 'extn_value': reason},
+                ]
+            revoked_certificates.append(revoked_cert)
+
+        crl_extensions = [
+            {'extn_id': 'crl_number', 'extn_value': crl_number},
+            {'extn_id': 'delta_crl_indicator', 'critical': True, 'extn_value': base_crl_number},
+        ]
+        key_identifier = self._ca_cert.asn1.key_identifier
+        if key_identifier is not None:
+            crl_extensions.append({'extn_id': 'authority_key_identifier',
+                                   'extn_value': {'key_identifier': key_identifier}})
+
+        tbs_cert_list = asn1crl.TbsCertList({
+            'version': 'v2',
+            'signature': signature_algorithm,
+            'issuer': self._ca_cert.asn1.subject,
+            'this_update': _make_time(this_update),
+            'next_update': _make_time(this_update + self._period),
+            'crl_extensions': crl_extensions,
+        })
+        # an empty list has to be left out, not encoded as an empty sequence
+        if revoked_certificates:
+            tbs_cert_list['revoked_certificates'] = revoked_certificates
+        return asn1crl.CertificateList({
+            'tbs_cert_list': tbs_cert_list,
+            'signature_algorithm': signature_algorithm,
+            'signature': sign(self._ca_key, tbs_cert_list.dump(), self._hash_algo),
+        })
+
+
+def _make_time(value: datetime) -> asn1x509.Time:
+    # UTCTime until 2049, GeneralizedTime after, as RFC 5280 requires
+    if value.year < 2050:
+        return asn1x509.Time(name='utc_time', value=value)
+    return asn1x509.Time(name='general_time', value=value)
@@ -1,27 +1,43 @@
 import os
+import json
+import uuid
+import hashlib
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, Iterable, List, Optional
 from subprocess import run, PIPE, DEVNULL
-from ..wrapper import PrivateKey, Cert, RevokedCert, SerialNumber, Crl
-from ..config import Param
+from ..wrapper import PrivateKey, Cert, RevokedCert, Crl
+from ..config import Param, strtobool
 from ..exceptions import BackendError
 from ..csr import CsrBuilder
-from .interfaces import IBackend
-from .openssl import Backend as OpenSSLBackend
+from ..cache import CertCache
+from .interfaces import IBackend, BatchResult
+from .openssl import Backend as OpenSSLBackend, delta_crl_path
+
+
+# variables sourced from "vars" files in this process, (root_dir, checksum of vars) -> variables
+_vars_cache = {}
 
 
 class Backend(IBackend):
     name = 'Easy-RSA 2.X'
     description = "OpenVPN's simple shell-based CA utility: https://github.com/OpenVPN/easy-rsa"
-    threadsafe = False
 
     init_requires = (
         Param('root_dir', help=f'Where the files of {name} are stored '
                                 '(where the file named "vars" is found)',
               convert=Path),
+        Param('locking', default=True, convert=strtobool,
+              help='Lock the CA database, so certificates can be issued from multiple '
+                   'threads and processes at the same time?'),
+        Param('cache_vars', default=True, convert=strtobool,
+              help='Save the variables from "vars" to a file, so it only needs to be run '
+                   'when it changes?'),
     )
 
-    def __init__(self, root_dir: Path):
+    # next to "vars", only readable by the owner, because the variables can contain a PIN
+    vars_cache_filename = '.certmaestro-vars.json'
+
+    def __init__(self, root_dir: Path, locking: bool=True, cache_vars: bool=True):
         if not root_dir.is_dir():
             raise BackendError('Root dir is not a directory')
         self._root_dir = root_dir
@@ -31,10 +47,60 @@ class Backend(IBackend):
         if not vars_file.is_file():
             raise BackendError('"vars" file is not a file')
         self._vars_file = vars_file
+        self._vars_cache_file = root_dir / self.vars_cache_filename if cache_vars else None
         self._env = self._get_full_env()
-        self._openssl_backend = self._make_openssl_backend()
+        self._openssl_backend = self._make_openssl_backend(locking)
+        # the same lock as for openssl, because Easy-RSA uses the same database
+        self._lock = self._openssl_backend._lock
+
+    @property
+    def threadsafe(self):
+        return self._openssl_backend.threadsafe
+
+    def close(self):
+        self._openssl_backend.close()
 
     def _get_full_env(self):
+        """The variables set by "vars", which is only run if it changed since last time."""
+        checksum = hashlib.sha256(self._vars_file.read_bytes()).hexdigest()
+        cache_key = (str(self._root_dir.resolve()), checksum)
+        env = _vars_cache.get(cache_key)
+        if env is None:
+            env = self._load_vars_cache(checksum)
+        if env is None:
+            env = self._source_vars()
+            self._save_vars_cache(checksum, env)
+        _vars_cache[cache_key] = env
+        full_env = dict(env)
+        # we need to merge it with the current process's env
+        full_env.update(os.environ)
+        return full_env
+
+    def _load_vars_cache(self, checksum: str):
+        if self._vars_cache_file is None:
+            return None
+        try:
+            with self._vars_cache_file.open() as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the directory might have been moved, and "vars" can use its path
+        if cached.get('root_dir') != str(self._root_dir.resolve()) or \
+                cached.get('checksum') != checksum:
+            return None
+        return cached.get('env')
+
+    def _save_vars_cache(self, checksum: str, env: dict):
+        if self._vars_cache_file is None:
+            return
+        cached = {'root_dir': str(self._root_dir.resolve()), 'checksum': checksum, 'env': env}
+        tmp_path = self._root_dir / f'{self.vars_cache_filename}.{uuid.uuid4().hex}'
+        fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(cached, f)
+        os.replace(str(tmp_path), str(self._vars_cache_file))
+
+    def _source_vars(self):
         varnames = ('EASY_RSA', 'OPENSSL', 'PKCS11TOOL', 'GREP', 'KEY_CONFIG', 'KEY_DIR',
                     'PKCS11_MODULE_PATH', 'PKCS11_PIN', 'KEY_SIZE', 'CA_EXPIRE', 'KEY_EXPIRE',
                     'KEY_COUNTRY', 'KEY_PROVINCE', 'KEY_CITY', 'KEY_ORG', 'KEY_EMAIL', 'KEY_OU',
@@ -48,24 +114,23 @@ class Backend(IBackend):
         result = run(command, shell=True, stdout=DEVNULL, stderr=PIPE, universal_newlines=True,
                      cwd=self._root_dir, check=True)
         var_values = result.stderr.splitlines()
-        env = dict(zip(varnames, var_values))
-        # we need to merge it with the current process's env
-        env.update(os.environ)
-        return env
+        return dict(zip(varnames, var_values))
 
     @property
     def _key_dir(self):
         return Path(self._env['KEY_DIR'])
 
-    def _make_openssl_backend(self):
+    def _make_openssl_backend(self, locking: bool):
         openssl_binary = Path(self._env['OPENSSL'])
         config_file = Path(self._env['KEY_CONFIG'])
         crl_file = self._key_dir / 'crl.pem'
-        return OpenSSLBackend(openssl_binary, config_file, self._root_dir, crl_file, env=self._env)
+        return OpenSSLBackend(openssl_binary, config_file, self._root_dir, crl_file,
+                              locking=locking, env=self._env)
 
-    def _run(self, *params):
-        result = run(params, cwd=self._root_dir, stdout=PIPE, stderr=PIPE, env=self._env,
-                     check=True, universal_newlines=True)
+    def _run(self, *params, env: Optional[dict]=None):
+        result = run(params, cwd=self._root_dir, stdout=PIPE, stderr=PIPE,
+                     env=self._env if env is None else env, check=True,
+                     universal_newlines=True)
         return result.stdout
 
     def get_ca_cert(self) -> Cert:
@@ -78,25 +143,60 @@ class Backend(IBackend):
         return self._openssl_backend.get_csr_defaults()
 
     def issue_cert(self, csr: CsrBuilder) -> (PrivateKey, Cert):
-        self._run('pkitool', '--batch', csr.common_name)
+        # making the key and the request doesn't touch the database, only signing has to wait
+        self._run('pkitool', '--batch', '--csr', csr.common_name)
+        with self._lock:
+            self._run('pkitool', '--batch', '--sign', csr.common_name)
         key_path = self._key_dir / f'{csr.common_name}.key'
         cert_path = self._key_dir / f'{csr.common_name}.crt'
         return PrivateKey.from_file(key_path), Cert.from_file(cert_path)
 
     def revoke_cert(self, serial: str) -> RevokedCert:
-        entry = self._openssl_backend._db.get_by_serial(serial)
-        # TODO: check for CalledProcessError and raise RevocationError()
-        self._run('revoke-full', entry.name.common_name)
-        for rc in Crl.from_file(self._key_dir / 'crl.pem'):
-            if rc.serial_number == SerialNumber(serial):
-                return rc
-
-    def list_certs(self) -> Iterator[Cert]:
-        yield from self._openssl_backend.list_certs()
+        result = self.revoke_certs([serial])[0]
+        if not result.succeeded:
+            raise result.error
+        return result.value
+
+    def revoke_certs(self, serials: Iterable[str], workers: int=1,
+                     reason: Optional[str]=None) -> List[BatchResult]:
+        """Revoke every certificate, then generate the CRL only once, instead of running
+        revoke-full for each of them. The value of the results is a RevokedCert, a serial which
+        is not found doesn't stop the others. workers is not used.
+        """
+        serials = list(serials)
+        crl_path = self._key_dir / 'crl.pem'
+        with self._lock:
+            errors = self._openssl_backend._mark_revoked(serials, reason)
+            if len(errors) < len(serials):
+                self._generate_crl(crl_path)
+        return self._openssl_backend._revocation_results(serials, errors, crl_path)
+
+    def _generate_crl(self, crl_path: Path):
+        # same as revoke-full, it has to be called holding the lock
+        self._run(self._env['OPENSSL'], 'ca', '-gencrl', '-out', str(crl_path),
+                  '-config', self._env['KEY_CONFIG'],
+                  env=dict(self._env, KEY_CN='', KEY_OU='', KEY_NAME='', KEY_ALTNAMES=''))
+
+    def list_certs(self, workers: int=1, ordered: bool=True,
+                   cache: Optional[CertCache]=None) -> Iterator[Cert]:
+        yield from self._openssl_backend.list_certs(workers, ordered, cache)
 
     def get_cert(self, serial: str) -> Cert:
         return self._openssl_backend.get_cert(serial)
 
+    def get_crl(self, streaming: bool=False) -> Crl:
+        return self._openssl_backend.get_crl(streaming)
+
+    def update_crl(self, delta: bool=False) -> Crl:
+        """The delta CRL is written next to the CRL, keys/crl-delta.pem."""
+        crl_path = self._key_dir / 'crl.pem'
+        if delta:
+            generator = self._openssl_backend._make_delta_crl_generator()
+            return generator.generate(crl_path, delta_crl_path(crl_path))
+        with self._lock:
+            self._generate_crl(crl_path)
+        return Crl.from_file(crl_path)
+
     @property
     def version(self) -> str:
         pkitool_version = self._run('pkitool', '--version').rstrip()
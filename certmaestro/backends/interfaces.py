@@ -1,6 +1,22 @@
-from typing import Iterator
+from typing import Iterator, Iterable, Optional, AsyncIterator
 from abc import ABCMeta, abstractmethod
+import attr
 from ..wrapper import PrivateKey, Cert, RevokedCert, Crl
+from ..cache import CertCache
+from ..csr import CsrBuilder
+from ..concurrency import map_concurrently
+
+
+@attr.s(slots=True, cmp=False)
+class BatchResult:
+    """Outcome of one item of a batch operation, either value or error is set."""
+    item = attr.ib()
+    value = attr.ib(default=None)
+    error = attr.ib(default=None)
+
+    @property
+    def succeeded(self):
+        return self.error is None
 
 
 class IBackend(metaclass=ABCMeta):
@@ -33,6 +49,15 @@ class IBackend(metaclass=ABCMeta):
     def version(self):
         """Backend software or library version."""
 
+    def close(self):
+        """Stop background work and release resources, like processes and connections."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     def validate_setup(self, **kwargs):
         """Check if setup would be successful."""
 
@@ -45,14 +70,128 @@ class IBackend(metaclass=ABCMeta):
     def issue_cert(self, common_name) -> (PrivateKey, Cert):
         """Issue a new cert for a Common Name."""
 
+    def issue_certs(self, csrs: Iterable[CsrBuilder], workers: int=1) -> Iterator[BatchResult]:
+        """Issue a certificate for every CSR, results are yielded as soon as they are ready.
+        The value of the results is a (PrivateKey, Cert) tuple. A failing item doesn't stop
+        the others. Backends which are not threadsafe issue certificates one by one.
+        """
+        if not self.threadsafe:
+            workers = 1
+        return map_concurrently(self._issue_cert_result, csrs, workers, ordered=False)
+
+    def _issue_cert_result(self, csr: CsrBuilder) -> BatchResult:
+        try:
+            return BatchResult(csr, self.issue_cert(csr))
+        except Exception as e:
+            return BatchResult(csr, error=e)
+
     def revoke_cert(self, serial: str) -> RevokedCert:
         """Revoke certificate by serial number."""
 
-    def list_certs(self) -> Iterator[Cert]:
-        """Get the list of all the issued certificates."""
+    def revoke_certs(self, serials: Iterable[str], workers: int=1) -> Iterator[BatchResult]:
+        """Revoke every certificate, results are yielded as soon as they are ready.
+        The value of the results is what revoke_cert returns. A failing item doesn't stop
+        the others. Backends which are not threadsafe revoke certificates one by one.
+        """
+        if not self.threadsafe:
+            workers = 1
+        return map_concurrently(self._revoke_cert_result, serials, workers, ordered=False)
+
+    def _revoke_cert_result(self, serial: str) -> BatchResult:
+        try:
+            return BatchResult(serial, self.revoke_cert(serial))
+        except Exception as e:
+            return BatchResult(serial, error=e)
+
+    def list_certs(self, workers: int=1, ordered: bool=True,
+                   cache: Optional[CertCache]=None) -> Iterator[Cert]:
+        """Get the list of all the issued certificates.
+        Certificates can be loaded by multiple workers; when ordered is False,
+        they are returned as soon as they are loaded. Backends storing certificates in files
+        can use the cache to avoid parsing unchanged files.
+        """
 
     def get_cert(self, serial: str) -> Cert:
         """Get certificate."""
 
-    def get_crl(self) -> Crl:
+    def get_crl(self, streaming: bool=False) -> Crl:
+        """Get certificate revocation list.
+        With streaming, a StreamingCrl is returned which decodes revoked certificates
+        only while iterating over it.
+        """
+
+    def update_crl(self, delta: bool=False) -> Crl:
+        """Generate a new certificate revocation list and return it.
+        With delta, a delta CRL (RFC 5280) is generated instead, which contains only the changes
+        since the last complete CRL.
+        """
+
+
+class IAsyncBackend(metaclass=ABCMeta):
+    """Backend for asyncio applications, every operation is a coroutine.
+    It has to be opened before use, and it is bound to the event loop it was opened on.
+    """
+
+    @property
+    @abstractmethod
+    def name(self):
+        """Official name of the backend."""
+
+    @property
+    @abstractmethod
+    def description(self):
+        """One-line description about the backend."""
+
+    @property
+    @abstractmethod
+    def init_requires(self):
+        """Params required for backend init like url or file path."""
+
+    @abstractmethod
+    async def open(self):
+        """Open connections and check the credentials."""
+
+    @abstractmethod
+    async def close(self):
+        """Close the connections opened by open()."""
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @abstractmethod
+    async def get_version(self) -> str:
+        """Backend software or library version."""
+
+    async def get_ca_cert(self) -> Cert:
+        """Get CA certificate."""
+
+    async def issue_cert(self, csr: CsrBuilder) -> (PrivateKey, Cert):
+        """Issue a new cert for the CSR."""
+
+    def issue_certs(self, csrs: Iterable[CsrBuilder],
+                    workers: int=10) -> AsyncIterator[BatchResult]:
+        """Issue a certificate for every CSR, same as IBackend.issue_certs."""
+
+    async def revoke_cert(self, serial: str):
+        """Revoke certificate by serial number."""
+
+    def revoke_certs(self, serials: Iterable[str],
+                     workers: int=10) -> AsyncIterator[BatchResult]:
+        """Revoke every certificate, same as IBackend.revoke_certs."""
+
+    def list_certs(self, workers: int=10, ordered: bool=True,
+                   cache: Optional[CertCache]=None) -> AsyncIterator[Cert]:
+        """Get the list of all the issued certificates, same as IBackend.list_certs."""
+
+    async def get_cert(self, serial: str) -> Cert:
+        """Get certificate."""
+
+    async def get_crl(self, streaming: bool=False) -> Crl:
         """Get certificate revocation list."""
+
+    async def update_crl(self, delta: bool=False) -> Crl:
+        """Generate a new certificate revocation list and return it."""
@@ -0,0 +1,141 @@
+"""
+    Pool of pre-generated private keys, so issuing a certificate doesn't have to wait for
+    key generation, which is the slowest part of it.
+"""
+import os
+import uuid
+import threading
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from oscrypto import asymmetric
+from ..exceptions import BackendError
+
+
+_EC_CURVES = {
+    256: 'secp256r1',
+    384: 'secp384r1',
+    521: 'secp521r1',
+}
+
+
+def check_key_params(algorithm: str, bit_size: int):
+    """Raise BackendError if keys with these settings can't be generated."""
+    if algorithm not in ('rsa', 'ec'):
+        raise BackendError(f'Unsupported key algorithm: {algorithm}')
+    if algorithm == 'ec' and bit_size not in _EC_CURVES:
+        raise BackendError(f'Unsupported EC key size: {bit_size}')
+
+
+def generate_private_key(algorithm: str, bit_size: int) -> bytes:
+    """Generate a private key in unencrypted PKCS#8 PEM format, same as openssl req -nodes."""
+    if algorithm == 'rsa':
+        _, private_key = asymmetric.generate_pair('rsa', bit_size=bit_size)
+    elif algorithm == 'ec':
+        _, private_key = asymmetric.generate_pair('ec', curve=_EC_CURVES[bit_size])
+    else:
+        raise BackendError(f'Unsupported key algorithm: {algorithm}')
+    return asymmetric.dump_private_key(private_key, None)
+
+
+class KeyPool:
+    """Private keys generated in the background by a pool of processes.
+    Every key is a separate file readable only by the owner, in a directory only accessible by
+    the owner. Keys are claimed by renaming, so multiple processes can share the same pool
+    without getting the same key.
+    """
+
+    def __init__(self, directory: Path, size: int, algorithm: str='rsa', bit_size: int=2048,
+                 workers: Optional[int]=None):
+        check_key_params(algorithm, bit_size)
+        self._directory = directory
+        self.size = size
+        self.algorithm = algorithm
+        self.bit_size = bit_size
+        self._workers = workers
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        # notified every time a pending key is finished
+        self._key_done = threading.Condition(self._lock)
+        directory.mkdir(mode=0o700, exist_ok=True)
+        os.chmod(str(directory), 0o700)
+
+    @property
+    def _suffix(self):
+        # keys with different settings never mix
+        return f'.{self.algorithm}{self.bit_size}.pem'
+
+    def _key_paths(self):
+        return sorted(self._directory.glob('*' + self._suffix))
+
+    def __len__(self):
+        return len(self._key_paths())
+
+    def take(self) -> Optional[str]:
+        """Remove a key from the pool and return it, None if the pool is empty.
+        Generating new keys is started in the background to refill the pool.
+        """
+        try:
+            for path in self._key_paths():
+                claimed_path = path.with_name(path.name + '.claimed')
+                try:
+                    path.rename(claimed_path)
+                except FileNotFoundError:
+                    # another process took it
+                    continue
+                key_pem = claimed_path.read_text()
+                claimed_path.unlink()
+                return key_pem
+            return None
+        finally:
+            self.refill()
+
+    def refill(self):
+        """Start generating as many keys in the background as missing from the pool."""
+        with self._lock:
+            missing = self.size - len(self) - len(self._pending)
+            if missing <= 0:
+                return
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self._workers)
+            futures = [self._executor.submit(generate_private_key, self.algorithm, self.bit_size)
+                       for _ in range(missing)]
+            self._pending.update(futures)
+        # a future which is already done calls _save_key right away, which needs the lock
+        for future in futures:
+            future.add_done_callback(self._save_key)
+
+    def fill(self):
+        """Generate the missing keys and wait for them."""
+        self.refill()
+        with self._lock:
+            while self._pending:
+                self._key_done.wait()
+
+    def _save_key(self, future):
+        try:
+            if future.cancelled() or future.exception() is not None:
+                return
+            # write to a temporary name first, so a half written key is never taken
+            tmp_path = self._directory / f'{uuid.uuid4().hex}.tmp'
+            fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(future.result())
+            tmp_path.rename(tmp_path.with_suffix(self._suffix))
+        finally:
+            # only after the key is in the pool, so fill() doesn't return too early
+            with self._lock:
+                self._pending.discard(future)
+                self._key_done.notify_all()
+
+    def close(self):
+        """Stop generating keys, the ones already being generated are still saved."""
+        with self._lock:
+            pending = list(self._pending)
+            executor, self._executor = self._executor, None
+        # cancel() calls _save_key right away, which needs the lock
+        for future in pending:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False)
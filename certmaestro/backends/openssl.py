@@ -2,24 +2,44 @@ import os
 import re
 import mmap
 import shutil
-from typing import Optional, Mapping
+import hashlib
+import threading
+import calendar
+from array import array
+from datetime import datetime, timezone
+from functools import partial
+from types import MappingProxyType
+from typing import Optional, Mapping, Iterable, List
 from configparser import (MissingSectionHeaderError, Interpolation, InterpolationSyntaxError,
-                          InterpolationMissingOptionError, ConfigParser)
+                          InterpolationMissingOptionError, ConfigParser,
+                          Error as ConfigParserError)
 from pathlib import Path
 from subprocess import run, PIPE
 from typing import Iterator
 import attr
-from ..wrapper import Cert, PrivateKey, Crl, SerialNumber, FromFileMixin, Name
-from ..config import Param
+from ..wrapper import (Cert, PrivateKey, Crl, StreamingCrl, RevokedCert, SerialNumber,
+                       FromFileMixin, Name)
+from ..config import Param, strtobool
 from ..exceptions import BackendError
 from ..csr import CsrPolicy, CsrBuilder
-from .interfaces import IBackend
+from ..concurrency import map_concurrently
+from ..cache import CertCache
+from ..locking import FileLock, NoLock
+from .interfaces import IBackend, BatchResult
+from .keypool import KeyPool, check_key_params, generate_private_key
+from .signer import InProcessSigner
+from .delta_crl import DeltaCrlGenerator
+from .shell import OpenSSLShellPool
+
+
+# the ones openssl ca -crl_reason accepts
+REVOCATION_REASONS = ('unspecified', 'keyCompromise', 'CACompromise', 'affiliationChanged',
+                      'superseded', 'cessationOfOperation', 'certificateHold', 'removeFromCRL')
 
 
 class Backend(IBackend):
     name = 'OpenSSL'
     description = 'Command line tools with openssl.cnf, https://www.openssl.org'
-    threadsafe = False
 
     init_requires = (
         Param('openssl_binary', help='Path to the openssl binary', convert=Path),
@@ -30,9 +50,28 @@ class Backend(IBackend):
               convert=Path),
         Param('crl_file', help='Path to the Certificate Revocation List file (usually crl.pem)',
               convert=Path),
+        Param('key_pool_size', default=0, convert=int,
+              help='Number of private keys generated in advance (0 means no pool)'),
+        Param('key_algorithm', default='rsa', help='Algorithm of private keys (rsa or ec)'),
+        Param('key_bit_size', default=2048, convert=int, help='Size of private keys'),
+        Param('generate_in_process', default=True, convert=strtobool,
+              help='Generate private keys and CSRs in Python instead of running openssl req?'),
+        Param('sign_in_process', default=False, convert=strtobool,
+              help='Sign certificates in Python instead of running openssl ca?'),
+        Param('locking', default=True, convert=strtobool,
+              help='Lock the CA database, so certificates can be issued from multiple '
+                   'threads and processes at the same time?'),
+        Param('shell_pool_size', default=0, convert=int,
+              help='Number of openssl processes kept running in interactive mode (0 means a new '
+                   'process for every command, OpenSSL 3.0 has no interactive mode)'),
+        Param('shell_timeout', default=30, convert=float,
+              help='Timeout of commands run in interactive mode (seconds)'),
     )
 
     def __init__(self, openssl_binary: Path, config_file: Path, root_dir: Path, crl_file: Path,
+                 key_pool_size: int=0, key_algorithm: str='rsa', key_bit_size: int=2048,
+                 generate_in_process: bool=True, sign_in_process: bool=False,
+                 locking: bool=True, shell_pool_size: int=0, shell_timeout: float=30,
                  env: Optional[Mapping]=None):
         if not self._check_file(openssl_binary):
             openssl_binary = Path(shutil.which(openssl_binary))
@@ -57,60 +96,98 @@ class Backend(IBackend):
 
         if env is None:
             env = os.environ.copy()
-        self._cnf = OpenSSLConfigParser(inline_comment_prefixes=('#', ';'), env=env)
-
-        with config_file.open() as f:
-            try:
-                self._cnf.read_file(f)
-            except MissingSectionHeaderError:
-                f.seek(0)
-                self._cnf.read_string('[dummy]' + f.read())
-
-        db_path = Path(root_dir / self._ca_section['database'])
+        self._env = env
+        self._config_lock = threading.Lock()
+        self._config_mtime = None
+        self._config_snapshot = None
+        self._sign_in_process = sign_in_process
+        self._signer = None
+
+        # the database and the lock stay the same even if the config file changes
+        db_path = self._config.database
         if not db_path.exists():
             raise BackendError(f'OpenSSL database file ({db_path}) is missing.')
         self._db = OpenSSLDbParser(db_path)
-
-    @staticmethod
-    def _check_file(openssl_binary):
-        return openssl_binary.is_file() and os.access(openssl_binary, os.F_OK)
-
-    @property
-    def _ca_section(self):
-        ca_section_name = self._cnf['ca']['default_ca']
-        return self._cnf[ca_section_name]
+        # every openssl ca run and every change of index.txt, serial and crlnumber is done
+        # holding this lock, openssl itself doesn't know about it
+        if locking:
+            self._lock = FileLock(db_path.with_name(db_path.name + '.lock'))
+        else:
+            self._lock = NoLock()
+        if sign_in_process:
+            self._signer = self._make_signer(self._config)
+
+        # openssl req would only fail with these when the first certificate is issued
+        check_key_params(key_algorithm, key_bit_size)
+        self._key_algorithm = key_algorithm
+        self._key_bit_size = key_bit_size
+        self._generate_in_process = generate_in_process
+        if key_pool_size > 0:
+            self._key_pool = KeyPool(root_dir / 'keypool', key_pool_size, key_algorithm,
+                                     key_bit_size)
+        else:
+            self._key_pool = None
+
+        if shell_pool_size > 0:
+            if self._config.oid_section is not None:
+                # the objects would be created again by the second command in the same process
+                raise BackendError('The openssl shell can not be used with a config file '
+                                   'containing oid_section')
+            # $ENV:: values in the config have to be the same for openssl as for us
+            self._shells = OpenSSLShellPool(shell_pool_size, openssl_binary, root_dir, env=env,
+                                            timeout=shell_timeout)
+        else:
+            self._shells = None
+        self._version = None
 
     @property
-    def _distinguished_name_section(self):
-        section_name = self._cnf['req']['distinguished_name']
-        return self._cnf[section_name]
+    def threadsafe(self):
+        return isinstance(self._lock, FileLock)
 
-    @property
-    def _policy_section(self):
-        section_name = self._ca_section['policy']
-        return self._cnf[section_name]
+    def close(self):
+        # keys which are not generated yet would keep the process from exiting
+        if self._key_pool is not None:
+            self._key_pool.close()
+        if self._shells is not None:
+            self._shells.close()
 
-    @property
-    def _new_certs_dir(self):
-        return self._root_dir / self._ca_section['new_certs_dir']
+    @staticmethod
+    def _check_file(openssl_binary):
+        return openssl_binary.is_file() and os.access(openssl_binary, os.F_OK)
 
     @property
-    def _certs_dir(self):
-        certs_dir = self._ca_section['certs']
-        if certs_dir:
-            return self._root_dir / certs_dir
-        else:
-            return self._root_dir / self._ca_section['dir'] / 'certs'
+    def _config(self) -> 'OpenSSLConfig':
+        """The resolved config file, which is only read again when it has been modified."""
+        mtime = self._config_path.stat().st_mtime_ns
+        if mtime != self._config_mtime:
+            with self._config_lock:
+                if mtime != self._config_mtime:
+                    self._reload_config(mtime)
+        return self._config_snapshot
+
+    def _reload_config(self, mtime: int):
+        config = OpenSSLConfig.from_file(self._config_path, self._root_dir, self._env)
+        # the signer is only made in __init__ when the database is already known
+        if self._signer is not None:
+            self._signer = self._make_signer(config)
+        self._config_snapshot = config
+        self._config_mtime = mtime
+
+    def _make_signer(self, config: 'OpenSSLConfig') -> InProcessSigner:
+        return InProcessSigner(config.ca, config.policy, config.x509_extensions,
+                               self._root_dir, self._db, self._lock)
 
     def _openssl(self, main_command, *params, input=None):
+        if self._shells is not None:
+            return self._shells.run(main_command, '-config', str(self._config_path), *params,
+                                    input=input)
         command = [self._openssl_binary, main_command, '-config', self._config_path, *params]
-        result = run(command, cwd=self._root_dir, stdout=PIPE, stderr=PIPE, input=input,
-                     check=True, universal_newlines=True)
+        result = run(command, cwd=self._root_dir, env=self._env, stdout=PIPE, stderr=PIPE,
+                     input=input, check=True, universal_newlines=True)
         return result.stdout
 
     def get_ca_cert(self) -> Cert:
-        ca_cert_path = self._root_dir / self._ca_section['certificate']
-        return Cert.from_file(ca_cert_path)
+        return Cert.from_file(self._config.certificate)
 
     def _adapt_policy(self, policy):
         policy = policy.lower()
@@ -122,34 +199,53 @@ class Backend(IBackend):
             return CsrPolicy.OPTIONAL
 
     def get_csr_policy(self):
-        psec = self._policy_section
+        # option names are lowercased by ConfigParser
+        psec = self._config.policy
         return {
-            'common_name': self._adapt_policy(psec['commonName']),
-            'country': self._adapt_policy(psec['countryName']),
-            'state': self._adapt_policy(psec['stateOrProvinceName']),
-            'locality': self._adapt_policy(psec['localityName']),
-            'org_name': self._adapt_policy(psec['organizationName']),
-            'org_unit': self._adapt_policy(psec['organizationalUnitName']),
-            'email': self._adapt_policy(psec['emailAddress']),
+            'common_name': self._adapt_policy(psec['commonname']),
+            'country': self._adapt_policy(psec['countryname']),
+            'state': self._adapt_policy(psec['stateorprovincename']),
+            'locality': self._adapt_policy(psec['localityname']),
+            'org_name': self._adapt_policy(psec['organizationname']),
+            'org_unit': self._adapt_policy(psec['organizationalunitname']),
+            'email': self._adapt_policy(psec['emailaddress']),
         }
 
     def get_csr_defaults(self):
-        dnsec = self._distinguished_name_section
+        dnsec = self._config.distinguished_name
         return {
-            'common_name': dnsec.get('commonName_default'),
-            'country': dnsec.get('countryName_default'),
-            'state': dnsec.get('stateOrProvinceName_default'),
-            'locality': dnsec.get('localityName_default'),
-            'org_name': dnsec.get('organizationName_default'),
-            'org_unit': dnsec.get('organizationalUnitName_default'),
-            'email': dnsec.get('emailAddress_default'),
+            'common_name': dnsec.get('commonname_default'),
+            'country': dnsec.get('countryname_default'),
+            'state': dnsec.get('stateorprovincename_default'),
+            'locality': dnsec.get('localityname_default'),
+            'org_name': dnsec.get('organizationname_default'),
+            'org_unit': dnsec.get('organizationalunitname_default'),
+            'email': dnsec.get('emailaddress_default'),
         }
 
     def issue_cert(self, csr: CsrBuilder) -> (PrivateKey, Cert):
-        # openssl req -newkey rsa -nodes -subj "/C=HU/ST=Pest megye/L=Budapest/O=Company/CN=Domain"
-        key_and_csr_pem = self._openssl('req', '-newkey', 'rsa', '-nodes', '-subj', csr.subject)
-        key_pem, csr_pem = self._split_pem(key_and_csr_pem)
-        cert_pem = self._openssl('ca', '-batch', '-notext', '-in', '/dev/stdin', input=csr_pem)
+        key_pem = self._key_pool.take() if self._key_pool is not None else None
+        if self._generate_in_process:
+            if key_pem is None:
+                key_pem = generate_private_key(self._key_algorithm, self._key_bit_size).decode()
+            csr_pem = csr.build_pem(key_pem)
+        elif key_pem is not None:
+            csr_pem = self._openssl('req', '-new', '-key', '/dev/stdin', '-subj', csr.subject,
+                                    input=key_pem)
+        else:
+            # openssl req -newkey rsa:2048 -nodes -subj "/C=HU/ST=Pest megye/L=Budapest/CN=Domain"
+            newkey = (f'{self._key_algorithm}:{self._key_bit_size}',)
+            if self._key_algorithm == 'ec':
+                newkey = 'ec', '-pkeyopt', f'ec_paramgen_curve:P-{self._key_bit_size}'
+            key_and_csr_pem = self._openssl('req', '-newkey', *newkey, '-nodes',
+                                            '-subj', csr.subject)
+            key_pem, csr_pem = self._split_pem(key_and_csr_pem)
+        if self._signer is not None:
+            cert_pem = self._signer.sign(csr_pem)
+        else:
+            with self._lock:
+                cert_pem = self._openssl('ca', '-batch', '-notext', '-in', '/dev/stdin',
+                                         input=csr_pem)
         cert = Cert(cert_pem)
         serial_hex = cert.serial_number.as_hex()
         self._save_pem(cert_pem, serial_hex + '.pem')
@@ -165,26 +261,138 @@ class Backend(IBackend):
         return key_pem, csr_pem
 
     def _save_pem(self, pem_data: str, filename: str):
-        path = self._certs_dir / filename
+        path = self._config.certs_dir / filename
         path.write_text(pem_data)
 
     def get_cert(self, serial: str) -> Cert:
         serial_hex = SerialNumber(serial).as_hex()
-        cert_path = self._new_certs_dir / f'{serial_hex}.pem'
+        cert_path = self._config.new_certs_dir / f'{serial_hex}.pem'
         return Cert.from_file(cert_path)
 
-    def list_certs(self) -> Iterator[Cert]:
-        for entry in self._db:
-            filename = entry.serial_number.as_hex() + '.pem'
-            yield Cert.from_file(self._new_certs_dir / filename)
+    def list_certs(self, workers: int=1, ordered: bool=True,
+                   cache: Optional[CertCache]=None) -> Iterator[Cert]:
+        new_certs_dir = self._config.new_certs_dir
+        paths = (new_certs_dir / (entry.serial_number.as_hex() + '.pem') for entry in self._db)
+        if cache is not None:
+            yield from cache.load_files(paths, workers, ordered)
+        else:
+            load_cert = partial(Cert.from_file, header_only=True)
+            # reading and parsing files doesn't touch any backend state, so it's safe in threads
+            yield from map_concurrently(load_cert, paths, workers, ordered)
+
+    def revoke_cert(self, serial: str) -> RevokedCert:
+        result = self.revoke_certs([serial])[0]
+        if not result.succeeded:
+            raise result.error
+        return result.value
+
+    def revoke_certs(self, serials: Iterable[str], workers: int=1,
+                     reason: Optional[str]=None) -> List[BatchResult]:
+        """Revoke every certificate, then generate the CRL only once. workers is not used,
+        the database is rewritten only once anyway.
+        """
+        serials = list(serials)
+        with self._lock:
+            errors = self._mark_revoked(serials, reason)
+            if len(errors) < len(serials):
+                self._generate_crl()
+        return self._revocation_results(serials, errors, self._crl_file)
+
+    @staticmethod
+    def _revocation_results(serials: List[str], errors: dict,
+                            crl_path: Path) -> List[BatchResult]:
+        # the CRL might not even exist when nothing was revoked
+        crl = Crl.from_file(crl_path) if len(errors) < len(serials) else None
+        results = []
+        for serial in serials:
+            if serial in errors:
+                results.append(BatchResult(serial, error=BackendError(errors[serial])))
+            else:
+                results.append(BatchResult(serial, crl.get_revoked(serial)))
+        return results
+
+    def _mark_revoked(self, serials: Iterable[str], reason: Optional[str]=None) -> dict:
+        """Set the certificates revoked in the database, the same as openssl ca -revoke,
+        but all of them with one rewrite of the file. Already revoked ones are left as they are.
+        It has to be called holding the lock. Returns the error message for every serial
+        which couldn't be revoked.
+        """
+        if reason is not None and reason not in REVOCATION_REASONS:
+            raise BackendError(f'Invalid revocation reason: {reason}')
+        db_path = self._config.database
+        lines = db_path.read_text().splitlines(keepends=True)
+        rows = {}
+        for index, line in enumerate(lines):
+            # openssl ca doesn't accept them either, not even blank lines
+            try:
+                rows[int(line.split('\t', 4)[3], 16)] = index
+            except (IndexError, ValueError):
+                raise BackendError(f'Invalid line {index + 1} in the OpenSSL database '
+                                   f'({db_path}): {line.rstrip()!r}') from None
+
+        revocation = datetime.now(timezone.utc).strftime('%y%m%d%H%M%SZ')
+        if reason is not None:
+            revocation += ',' + reason
+        errors = {}
+        changed = False
+        for serial in serials:
+            try:
+                index = rows.get(int(SerialNumber(serial)))
+            except ValueError:
+                errors[serial] = f'Invalid serial number: {serial}'
+                continue
+            if index is None:
+                errors[serial] = f'Certificate not found: {serial}'
+                continue
+            status, expiration, _, rest = lines[index].split('\t', 3)
+            if status != 'R':
+                lines[index] = '\t'.join(('R', expiration, revocation, rest))
+                changed = True
+
+        if changed:
+            # same as openssl, the previous version is kept as .old
+            new_path = db_path.with_name(db_path.name + '.new')
+            new_path.write_text(''.join(lines))
+            os.replace(str(db_path), str(db_path.with_name(db_path.name + '.old')))
+            os.replace(str(new_path), str(db_path))
+        return errors
+
+    def get_crl(self, streaming: bool=False):
+        if streaming:
+            return StreamingCrl.from_file(self._crl_file)
+        return Crl.from_file(self._crl_file)
 
-    def get_crl(self):
+    def update_crl(self, delta: bool=False) -> Crl:
+        """The delta CRL is written next to the CRL file, crl.pem -> crl-delta.pem."""
+        if delta:
+            generator = self._make_delta_crl_generator()
+            return generator.generate(self._crl_file, delta_crl_path(self._crl_file))
+        with self._lock:
+            self._generate_crl()
         return Crl.from_file(self._crl_file)
 
+    def _generate_crl(self):
+        # it has to be called holding the lock, openssl ca -gencrl updates crlnumber
+        self._openssl('ca', '-gencrl', '-out', str(self._crl_file))
+
+    def _make_delta_crl_generator(self) -> DeltaCrlGenerator:
+        return DeltaCrlGenerator(self._config.ca, self._root_dir, self._db, self._lock)
+
     @property
     def version(self) -> str:
-        result = run([self._openssl_binary, 'version'], stdout=PIPE, universal_newlines=True)
-        return result.stdout.rstrip()
+        # the binary doesn't change while we are running
+        if self._version is None:
+            if self._shells is not None:
+                self._version = self._shells.run('version').rstrip()
+            else:
+                result = run([self._openssl_binary, 'version'], stdout=PIPE,
+                             universal_newlines=True)
+                self._version = result.stdout.rstrip()
+        return self._version
+
+
+def delta_crl_path(crl_path: Path) -> Path:
+    return crl_path.with_name(f'{crl_path.stem}-delta{crl_path.suffix}')
 
 
 class OpenSSLInterpolation(Interpolation):
@@ -229,14 +437,168 @@ class OpenSSLConfigParser(ConfigParser):
         super().__init__(*args, **kwargs)
 
 
-@attr.s
+@attr.s(slots=True, frozen=True)
+class OpenSSLConfig:
+    """Snapshot of the values the backend needs from openssl.cnf.
+    Everything is interpolated once when loaded, so reading them is a plain attribute access.
+    Option names in the sections are lowercase, as ConfigParser makes them.
+    """
+    ca = attr.ib()
+    policy = attr.ib()
+    distinguished_name = attr.ib()
+    # None if the CA section has no x509_extensions
+    x509_extensions = attr.ib()
+    certificate = attr.ib()
+    database = attr.ib()
+    new_certs_dir = attr.ib()
+    certs_dir = attr.ib()
+    # section of additional object identifiers, None if there is none
+    oid_section = attr.ib()
+
+    @classmethod
+    def from_file(cls, config_file: Path, root_dir: Path, env: Mapping):
+        """Relative paths in the config are resolved from root_dir."""
+        cnf = OpenSSLConfigParser(inline_comment_prefixes=('#', ';'), env=env)
+        with config_file.open() as f:
+            try:
+                cnf.read_file(f)
+            except MissingSectionHeaderError:
+                f.seek(0)
+                cnf.read_string('[dummy]\n' + f.read())
+
+        try:
+            ca = _resolve_section(cnf, cnf['ca']['default_ca'])
+            policy = _resolve_section(cnf, ca['policy'])
+            distinguished_name = {}
+            if cnf.has_option('req', 'distinguished_name'):
+                distinguished_name = _resolve_section(cnf, cnf['req']['distinguished_name'])
+            x509_extensions = None
+            if 'x509_extensions' in ca:
+                x509_extensions = _resolve_section(cnf, ca['x509_extensions'])
+            certs_dir = root_dir / ca['certs'] if ca.get('certs') else \
+                root_dir / ca['dir'] / 'certs'
+            return cls(
+                ca=ca,
+                policy=policy,
+                distinguished_name=MappingProxyType(distinguished_name),
+                x509_extensions=x509_extensions,
+                certificate=root_dir / ca['certificate'],
+                database=root_dir / ca['database'],
+                new_certs_dir=root_dir / ca['new_certs_dir'],
+                certs_dir=certs_dir,
+                oid_section=cnf.get('dummy', 'oid_section', fallback=None),
+            )
+        except (KeyError, ConfigParserError) as e:
+            raise BackendError(f'Invalid OpenSSL config file ({config_file}): {e}') from e
+
+
+def _resolve_section(cnf: OpenSSLConfigParser, section_name: str) -> Mapping:
+    return MappingProxyType(dict(cnf[section_name].items()))
+
+
+def _parse_db_time(value: bytes) -> int:
+    """Convert YYMMDDHHMMSSZ or YYYYMMDDHHMMSSZ to a UNIX timestamp."""
+    if len(value) == 13:
+        year = int(value[:2])
+        # same as UTCTime in RFC 5280
+        year += 1900 if year >= 50 else 2000
+        value = value[2:]
+    else:
+        year = int(value[:4])
+        value = value[4:]
+    return calendar.timegm((year, int(value[0:2]), int(value[2:4]),
+                            int(value[4:6]), int(value[6:8]), int(value[8:10])))
+
+
+class OpenSSLDbColumns:
+    """Column oriented store of the OpenSSL database lines.
+    Only the columns needed for listing and filtering are parsed up front, everything else is
+    referenced by offsets into the memory mapped file.
+    """
+
+    def __init__(self):
+        self.mm = None
+        # end of the last stored line
+        self.end = 0
+        self.statuses = bytearray()
+        self.expirations = array('q')
+        # serial numbers can be longer than 64 bits
+        self.serials = []
+        self.line_offsets = array('Q')
+        self.dn_offsets = array('Q')
+        # serial number as int -> row
+        self.serial_rows = {}
+
+    def __len__(self):
+        return len(self.line_offsets)
+
+    def append(self, offset: int, line: bytes):
+        status, expiration, revocation, serial, filename, _ = line.split(b'\t', 5)
+        serial_int = int(serial, 16)
+        self.serial_rows[serial_int] = len(self.line_offsets)
+        self.statuses.append(status[0])
+        self.expirations.append(_parse_db_time(expiration))
+        self.serials.append(serial_int)
+        self.line_offsets.append(offset)
+        # 5 tabs before the distinguished name
+        dn_offset = offset + len(status) + len(expiration) + len(revocation) + len(serial) + \
+            len(filename) + 5
+        self.dn_offsets.append(dn_offset)
+        self.end = offset + len(line)
+
+    def _line_end(self, row: int):
+        return self.line_offsets[row + 1] if row + 1 < len(self) else self.end
+
+    def get_columns(self, row: int):
+        line = self.mm[self.line_offsets[row]:self._line_end(row)]
+        return line.rstrip(b'\r\n').decode().split('\t')
+
+    def get_dn(self, row: int):
+        return self.mm[self.dn_offsets[row]:self._line_end(row)].rstrip(b'\r\n').decode()
+
+
 class OpenSSLDbEntry:
-    status = attr.ib()
-    expiration = attr.ib()
-    revocation = attr.ib()
-    serial_number = attr.ib(convert=SerialNumber)
-    filename = attr.ib()
-    name = attr.ib(convert=Name)
+    """One row of the OpenSSL database, serial number and name are only converted on access."""
+
+    __slots__ = ('_columns', '_row', '_serial_number', '_name')
+
+    def __init__(self, columns: OpenSSLDbColumns, row: int):
+        self._columns = columns
+        self._row = row
+        self._serial_number = None
+        self._name = None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}: {self.status} {self.serial_number}>'
+
+    @property
+    def status(self):
+        return chr(self._columns.statuses[self._row])
+
+    @property
+    def expiration(self):
+        timestamp = self._columns.expirations[self._row]
+        return datetime.fromtimestamp(timestamp, timezone.utc)
+
+    @property
+    def revocation(self):
+        return self._columns.get_columns(self._row)[2]
+
+    @property
+    def serial_number(self):
+        if self._serial_number is None:
+            self._serial_number = SerialNumber.from_int(self._columns.serials[self._row])
+        return self._serial_number
+
+    @property
+    def filename(self):
+        return self._columns.get_columns(self._row)[4]
+
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = Name(self._columns.get_dn(self._row))
+        return self._name
 
 
 class OpenSSLDbParser:
@@ -253,35 +615,88 @@ class OpenSSLDbParser:
 
     def __init__(self, db_file: Path):
         self._file = db_file
-        if not self._is_db_empty():
-            # have to keep the reference to the opened file
-            self._open_file = db_file.open('r+b')
-            self._mm = mmap.mmap(self._open_file.fileno(), 0)
-        else:
-            self._open_file = None
-            self._mm = None
-
-    def _is_db_empty(self):
-        return self._file.stat().st_size == 0
+        # (mtime, size) of the file when it was last mapped and indexed
+        self._file_version = None
+        self._columns = OpenSSLDbColumns()
+        # checksum of the already indexed part of the file
+        self._parsed_digest = hashlib.sha1()
+        self._refresh_lock = threading.Lock()
+
+    def _get_file_version(self):
+        stat = self._file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        """Remap the file if it changed since we last looked at it and index the new lines.
+        OpenSSL appends new certificates to the end of the file, so if the already indexed part
+        is unchanged, only the new lines are indexed, otherwise everything is read again.
+        """
+        with self._refresh_lock:
+            self._refresh_unlocked()
+
+    def _refresh_unlocked(self):
+        file_version = self._get_file_version()
+        if file_version == self._file_version:
+            return
+        self._file_version = file_version
+        mm = None
+        # an empty file can't be mmapped
+        if file_version[1] != 0:
+            with self._file.open('rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # the old map is not closed explicitly, other threads might be reading it right now
+        # without the lock; it is freed when nothing refers to it anymore
+        if not self._is_prefix_unchanged(mm):
+            # entries handed out earlier keep the old columns and the old map alive
+            self._columns = OpenSSLDbColumns()
+            self._parsed_digest = hashlib.sha1()
+        self._columns.mm = mm
+        if mm is not None:
+            self._index_new_lines()
+
+    def _is_prefix_unchanged(self, mm):
+        end = self._columns.end
+        if end == 0:
+            return True
+        if mm is None or len(mm) < end:
+            return False
+        # openssl ca writes a new file and renames it even when it only appends a line, so the
+        # inode tells nothing, and rows can change without changing the size (V -> E by
+        # -updatedb), so only a checksum of the whole indexed part is reliable. Hashing is
+        # still much cheaper than parsing the lines again.
+        return hashlib.sha1(mm[:end]).digest() == self._parsed_digest.digest()
+
+    def _index_new_lines(self):
+        columns = self._columns
+        mm = columns.mm
+        start = offset = columns.end
+        # lines without a newline at the end might be written right now
+        end = mm.rfind(b'\n', offset) + 1
+        mm.seek(offset)
+        while offset < end:
+            line = mm.readline()
+            columns.append(offset, line)
+            offset += len(line)
+        self._parsed_digest.update(mm[start:offset])
 
     def __iter__(self):
         # it can have content since we last tried
-        if self._is_db_empty():
-            return iter(())
-        self._mm.seek(0)
-        return self._iter_file()
-
-    def __del__(self):
-        if self._open_file is not None:
-            self._open_file.close()
-            self._mm.close()
-
-    def _iter_file(self):
-        for line in iter(self._mm.readline, b''):
-            columns = line.rstrip().decode().split('\t')
-            yield OpenSSLDbEntry(*columns)
-
-    def get_by_serial(self, serial: str):
-        for entry in self:
-            if entry.serial_number == SerialNumber(serial):
-                return entry
+        self._refresh()
+        columns = self._columns
+        return (OpenSSLDbEntry(columns, row) for row in range(len(columns)))
+
+    def has_valid_subject(self, dn: str) -> bool:
+        """Is there a valid certificate with this distinguished name (/CN=...) already?"""
+        self._refresh()
+        columns = self._columns
+        valid = ord('V')
+        return any(columns.statuses[row] == valid and columns.get_dn(row) == dn
+                   for row in range(len(columns)))
+
+    def get_by_serial_number(self, serial: str):
+        self._refresh()
+        serial_int = int(SerialNumber(serial))
+        row = self._columns.serial_rows.get(serial_int)
+        if row is None:
+            return None
+        return OpenSSLDbEntry(self._columns, row)
@@ -0,0 +1,162 @@
+"""
+    Long running openssl processes in interactive mode, so running a command costs a round trip
+    through a pipe instead of starting a new process every time.
+    The interactive mode was removed in OpenSSL 3.0, it works with 1.0 and 1.1.
+"""
+import os
+import time
+import select
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from subprocess import Popen, PIPE, CalledProcessError, TimeoutExpired
+from typing import Optional, Mapping
+from ..exceptions import BackendError
+
+
+PROMPT = b'OpenSSL> '
+
+
+class OpenSSLShell:
+    """One openssl process reading commands from stdin, running one command at a time.
+    The output of a command ends when the next prompt is printed, errors are printed to stderr
+    before that, ending with an 'error in <command>' line.
+    """
+
+    def __init__(self, openssl_binary: Path, cwd: Path, env: Optional[Mapping]=None,
+                 timeout: float=30):
+        self.timeout = timeout
+        self._process = Popen([str(openssl_binary)], cwd=str(cwd), env=env, stdin=PIPE,
+                              stdout=PIPE, stderr=PIPE)
+        # for commands which would read their input from stdin
+        self._input_dir = tempfile.mkdtemp(prefix='certmaestro-')
+        try:
+            self._read_output()
+        except BackendError:
+            raise BackendError(f'{openssl_binary} has no interactive mode, '
+                               'which was removed in OpenSSL 3.0') from None
+
+    @property
+    def running(self):
+        return self._process.poll() is None
+
+    def run(self, *args: str, input: Optional[str]=None) -> str:
+        """Run the command and return its output like subprocess.run(check=True) would,
+        raising CalledProcessError if the command fails. Input is written to a temporary file
+        which replaces the /dev/stdin arguments.
+        """
+        if not self.running:
+            raise BackendError('The openssl process is not running')
+        input_path = None
+        if input is not None:
+            fd, input_path = tempfile.mkstemp(dir=self._input_dir)
+            with os.fdopen(fd, 'w') as f:
+                f.write(input)
+            args = tuple(input_path if arg == '/dev/stdin' else arg for arg in args)
+        try:
+            command_line = ' '.join(_quote(arg) for arg in args) + '\n'
+            try:
+                self._process.stdin.write(command_line.encode())
+                self._process.stdin.flush()
+            except BrokenPipeError:
+                self.close()
+                raise BackendError('The openssl process exited unexpectedly')
+            stdout, stderr = self._read_output()
+        finally:
+            if input_path is not None:
+                os.unlink(input_path)
+        if stderr.rstrip('\n').rpartition('\n')[2].startswith(f'error in {args[0]}'):
+            raise CalledProcessError(1, args, stdout, stderr)
+        return stdout
+
+    def _read_output(self):
+        stdout_fd = self._process.stdout.fileno()
+        stderr_fd = self._process.stderr.fileno()
+        stdout, stderr = bytearray(), bytearray()
+        deadline = time.monotonic() + self.timeout
+        while not stdout.endswith(PROMPT):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise BackendError(f'openssl command timed out after {self.timeout} seconds')
+            # stderr has to be read too, otherwise openssl could block on writing it
+            readable, _, _ = select.select([stdout_fd, stderr_fd], [], [], remaining)
+            if stderr_fd in readable:
+                stderr += os.read(stderr_fd, 65536)
+            if stdout_fd in readable:
+                data = os.read(stdout_fd, 65536)
+                if not data:
+                    self.close()
+                    raise BackendError('The openssl process exited unexpectedly')
+                stdout += data
+        # errors are written before the prompt, so the rest of them is already in the pipe
+        while select.select([stderr_fd], [], [], 0)[0]:
+            data = os.read(stderr_fd, 65536)
+            if not data:
+                break
+            stderr += data
+        return stdout[:-len(PROMPT)].decode(), stderr.decode()
+
+    def close(self):
+        if self.running:
+            # openssl exits at the end of its input
+            self._process.stdin.close()
+            try:
+                self._process.wait(1)
+            except TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        for pipe in (self._process.stdin, self._process.stdout, self._process.stderr):
+            pipe.close()
+        shutil.rmtree(self._input_dir, ignore_errors=True)
+
+
+def _quote(arg: str) -> str:
+    # openssl splits the line on whitespace, an argument can be enclosed in ' or " only
+    if '\n' in arg:
+        raise BackendError(f'Argument can not contain new line in openssl shell: {arg!r}')
+    if arg and not any(c.isspace() for c in arg):
+        return arg
+    if '"' not in arg:
+        return f'"{arg}"'
+    if "'" not in arg:
+        return f"'{arg}'"
+    raise BackendError(f'Argument can not contain both kinds of quotes in openssl shell: {arg}')
+
+
+class OpenSSLShellPool:
+    """At most size shells, started when needed, every shell is used by one thread at a time.
+    The first shell is started right away, so a missing interactive mode is found out early.
+    """
+
+    def __init__(self, size: int, openssl_binary: Path, cwd: Path,
+                 env: Optional[Mapping]=None, timeout: float=30):
+        self._shell_args = (openssl_binary, cwd, env, timeout)
+        self._available = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = [OpenSSLShell(*self._shell_args)]
+
+    def run(self, *args: str, input: Optional[str]=None) -> str:
+        with self._available:
+            with self._lock:
+                shell = self._idle.pop() if self._idle else None
+            if shell is None or not shell.running:
+                shell = OpenSSLShell(*self._shell_args)
+            try:
+                return shell.run(*args, input=input)
+            except BaseException as e:
+                if not isinstance(e, CalledProcessError):
+                    # the output of an interrupted command would be read as the next one's
+                    shell.close()
+                raise
+            finally:
+                if shell.running:
+                    with self._lock:
+                        self._idle.append(shell)
+
+    def close(self):
+        with self._lock:
+            shells, self._idle = self._idle, []
+        for shell in shells:
+            shell.close()
@@ -0,0 +1,291 @@
+"""
+    Signing certificate requests in Python with the CA configured in openssl.cnf, instead of
+    starting an openssl ca process for every certificate.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Mapping, Optional
+import asn1crypto.csr as asn1csr
+import asn1crypto.pem as asn1pem
+import asn1crypto.x509 as asn1x509
+from certbuilder import CertificateBuilder
+from oscrypto import asymmetric
+from oscrypto.errors import SignatureError
+from ..exceptions import BackendError
+from ..locking import FileLock
+
+
+# ConfigParser lowercases the keys, OpenSSL accepts both long and short names in policies
+_FIELD_NAMES = {
+    'countryname': 'country_name',
+    'c': 'country_name',
+    'stateorprovincename': 'state_or_province_name',
+    'st': 'state_or_province_name',
+    'localityname': 'locality_name',
+    'l': 'locality_name',
+    'organizationname': 'organization_name',
+    'o': 'organization_name',
+    'organizationalunitname': 'organizational_unit_name',
+    'ou': 'organizational_unit_name',
+    'commonname': 'common_name',
+    'cn': 'common_name',
+    'emailaddress': 'email_address',
+}
+
+# names in the OpenSSL database
+_SHORT_NAMES = {
+    'country_name': 'C',
+    'state_or_province_name': 'ST',
+    'locality_name': 'L',
+    'organization_name': 'O',
+    'organizational_unit_name': 'OU',
+    'common_name': 'CN',
+    'email_address': 'emailAddress',
+}
+
+_KEY_USAGES = {
+    'digitalSignature': 'digital_signature',
+    'nonRepudiation': 'non_repudiation',
+    'keyEncipherment': 'key_encipherment',
+    'dataEncipherment': 'data_encipherment',
+    'keyAgreement': 'key_agreement',
+    'keyCertSign': 'key_cert_sign',
+    'cRLSign': 'crl_sign',
+    'encipherOnly': 'encipher_only',
+    'decipherOnly': 'decipher_only',
+}
+
+_EXTENDED_KEY_USAGES = {
+    'serverAuth': 'server_auth',
+    'clientAuth': 'client_auth',
+    'codeSigning': 'code_signing',
+    'emailProtection': 'email_protection',
+    'timeStamping': 'time_stamping',
+    'OCSPSigning': 'ocsp_signing',
+}
+
+_HASH_ALGORITHMS = ('sha1', 'sha256', 'sha384', 'sha512')
+
+_VERIFY_FUNCTIONS = {
+    'rsassa_pkcs1v15': asymmetric.rsa_pkcs1v15_verify,
+    'ecdsa': asymmetric.ecdsa_verify,
+    'dsa': asymmetric.dsa_verify,
+}
+
+
+class InProcessSigner:
+    """Signs certificate requests the same way as openssl ca -batch, with the policy,
+    default_days, default_md and unique_subject settings of the CA section.
+    From the x509_extensions section only basicConstraints, keyUsage and extendedKeyUsage are
+    supported, key identifiers are always added.
+    Serial numbers are reserved and the database is appended under the lock, so it can be used
+    from multiple threads and processes, signing itself happens outside of it.
+    """
+
+    def __init__(self, ca_section: Mapping, policy_section: Mapping,
+                 extensions_section: Optional[Mapping], root_dir: Path, db, lock: FileLock):
+        self._db = db
+        self._lock = lock
+        self._serial_path = root_dir / ca_section['serial']
+        self._db_path = root_dir / ca_section['database']
+        self._new_certs_dir = root_dir / ca_section['new_certs_dir']
+
+        default_days = ca_section.get('default_days')
+        if default_days is None:
+            raise BackendError('default_days is missing from the CA section')
+        self._days = int(default_days)
+
+        self._hash_algo = _read_hash_algo(ca_section)
+
+        self._unique_subject = self._read_unique_subject(ca_section)
+        self._policy = self._read_policy(policy_section)
+        self._ca, self._key_usage, self._extended_key_usage = \
+            self._read_extensions(extensions_section or {})
+
+        self._ca_cert, self._ca_key = _load_ca(ca_section, root_dir)
+
+    def _read_unique_subject(self, ca_section):
+        # openssl ca keeps the setting in index.txt.attr after the first certificate
+        attr_path = self._db_path.with_name(self._db_path.name + '.attr')
+        value = ca_section.get('unique_subject', 'yes')
+        if attr_path.exists():
+            for line in attr_path.read_text().splitlines():
+                key, _, attr_value = line.partition('=')
+                if key.strip() == 'unique_subject':
+                    value = attr_value.strip()
+        return value.lower() in ('y', 'yes', 'true', '1')
+
+    @staticmethod
+    def _read_policy(policy_section):
+        policy = []
+        for field, field_policy in policy_section.items():
+            name = _FIELD_NAMES.get(field)
+            if name is None:
+                raise BackendError(f'Unsupported field in policy: {field}')
+            field_policy = field_policy.lower()
+            if field_policy not in ('match', 'supplied', 'optional'):
+                raise BackendError(f'Invalid policy for {field}: {field_policy}')
+            policy.append((name, field_policy))
+        return policy
+
+    @staticmethod
+    def _read_extensions(extensions_section):
+        ca, key_usage, extended_key_usage = False, None, None
+        for key, value in extensions_section.items():
+            # critical is decided by certbuilder
+            values = [v.strip() for v in value.split(',') if v.strip() != 'critical']
+            try:
+                if key == 'basicconstraints':
+                    if len(values) != 1 or values[0].upper() not in ('CA:TRUE', 'CA:FALSE'):
+                        raise KeyError(value)
+                    ca = values[0].upper() == 'CA:TRUE'
+                elif key == 'keyusage':
+                    key_usage = {_KEY_USAGES[v] for v in values}
+                elif key == 'extendedkeyusage':
+                    extended_key_usage = {_EXTENDED_KEY_USAGES[v] for v in values}
+                elif key not in ('subjectkeyidentifier', 'authoritykeyidentifier'):
+                    raise KeyError(key)
+            except KeyError as e:
+                raise BackendError(f'Extension is not supported by the in-process signer: '
+                                   f'{e.args[0]}, use openssl ca instead.') from None
+        return ca, key_usage, extended_key_usage
+
+    def sign(self, csr_pem: str) -> str:
+        """Sign the PEM encoded certificate request and return the PEM encoded certificate."""
+        request = _load_request(csr_pem)
+        request_info = request['certification_request_info']
+        public_key = asymmetric.load_public_key(request_info['subject_pk_info'])
+        _verify_request(request, public_key)
+        subject = self._apply_policy(request_info['subject'])
+
+        builder = CertificateBuilder(subject, public_key)
+        builder.issuer = self._ca_cert
+        builder.hash_algo = self._hash_algo
+        builder.ca = self._ca
+        if self._key_usage is not None:
+            builder.key_usage = self._key_usage
+        if self._extended_key_usage is not None:
+            builder.extended_key_usage = self._extended_key_usage
+        builder.begin_date = datetime.now(timezone.utc).replace(microsecond=0)
+        builder.end_date = builder.begin_date + timedelta(days=self._days)
+
+        dn = _format_dn(subject)
+        with self._lock:
+            # same as openssl ca, no serial is used up for a duplicate subject
+            self._check_unique_subject(dn)
+            builder.serial_number = self._take_serial()
+        cert = builder.build(self._ca_key)
+        cert_pem = asn1pem.armor('CERTIFICATE', cert.dump()).decode()
+
+        serial_hex = _format_serial(cert.serial_number)
+        with self._lock:
+            # another certificate with the same subject might have been issued while signing
+            self._check_unique_subject(dn)
+            _write_file(self._new_certs_dir / f'{serial_hex}.pem', cert_pem.encode())
+            expiration = _format_db_time(builder.end_date)
+            line = f'V\t{expiration}\t\t{serial_hex}\tunknown\t{dn}\n'
+            # one write to a file opened for appending, a reader never sees half a line
+            with self._db_path.open('ab') as f:
+                f.write(line.encode())
+        return cert_pem
+
+    def _check_unique_subject(self, dn: str):
+        if self._unique_subject and self._db.has_valid_subject(dn):
+            raise BackendError(f'There is already a valid certificate for {dn}')
+
+    def _take_serial(self) -> int:
+        try:
+            serial = int(self._serial_path.read_text().strip(), 16)
+        except FileNotFoundError:
+            raise BackendError(f'OpenSSL serial file ({self._serial_path}) is missing.')
+        _write_file(self._serial_path, (_format_serial(serial + 1) + '\n').encode())
+        return serial
+
+    def _apply_policy(self, request_subject: asn1x509.Name) -> asn1x509.Name:
+        """Keep only the fields in the policy, in the order of the policy like openssl ca."""
+        request_values = {}
+        for rdn in request_subject.chosen:
+            for type_and_value in rdn:
+                request_values.setdefault(type_and_value['type'].native, type_and_value)
+        ca_subject = self._ca_cert.asn1.subject.native
+
+        rdns = []
+        for name, policy in self._policy:
+            type_and_value = request_values.get(name)
+            value = type_and_value['value'].native if type_and_value is not None else None
+            if policy == 'match' and value != ca_subject.get(name):
+                raise BackendError(f'The {name} field needed to be the same in the CA '
+                                   f'certificate ({ca_subject.get(name)}) and the request '
+                                   f'({value})')
+            elif policy == 'supplied' and not value:
+                raise BackendError(f'The {name} field needed to be supplied and was missing')
+            if value:
+                rdns.append(asn1x509.RelativeDistinguishedName([type_and_value.copy()]))
+        if not rdns:
+            raise BackendError('The subject of the request is empty')
+        return asn1x509.Name(name='', value=asn1x509.RDNSequence(rdns))
+
+
+def _read_hash_algo(ca_section: Mapping) -> str:
+    hash_algo = ca_section.get('default_md', 'default').lower()
+    if hash_algo == 'default':
+        return 'sha256'
+    if hash_algo not in _HASH_ALGORITHMS:
+        raise BackendError(f'Unsupported message digest: {hash_algo}')
+    return hash_algo
+
+
+def _load_ca(ca_section: Mapping, root_dir: Path):
+    ca_cert = asymmetric.load_certificate(str(root_dir / ca_section['certificate']))
+    try:
+        ca_key = asymmetric.load_private_key(str(root_dir / ca_section['private_key']))
+    except (ValueError, TypeError, OSError) as e:
+        raise BackendError(f'Could not load the CA private key, it might be encrypted: {e}')
+    return ca_cert, ca_key
+
+
+def _load_request(csr_pem: str) -> asn1csr.CertificationRequest:
+    try:
+        _, _, der = asn1pem.unarmor(csr_pem.encode())
+        return asn1csr.CertificationRequest.load(der)
+    except ValueError as e:
+        raise BackendError(f'Invalid certificate request: {e}')
+
+
+def _verify_request(request: asn1csr.CertificationRequest, public_key):
+    signature_algorithm = request['signature_algorithm']
+    verify = _VERIFY_FUNCTIONS.get(signature_algorithm.signature_algo)
+    if verify is None:
+        raise BackendError(f'Unsupported request signature: {signature_algorithm.signature_algo}')
+    try:
+        verify(public_key, request['signature'].native,
+               request['certification_request_info'].dump(), signature_algorithm.hash_algo)
+    except SignatureError:
+        raise BackendError('Signature verification of the certificate request failed')
+
+
+def _format_dn(name: asn1x509.Name) -> str:
+    return ''.join(f"/{_SHORT_NAMES[tv['type'].native]}={tv['value'].native}"
+                   for rdn in name.chosen for tv in rdn)
+
+
+def _format_serial(serial: int) -> str:
+    serial_hex = format(serial, 'X')
+    return '0' + serial_hex if len(serial_hex) % 2 == 1 else serial_hex
+
+
+def _format_db_time(value: datetime) -> str:
+    # UTCTime until 2049, GeneralizedTime after, same as in the certificate
+    if value.year < 2050:
+        return value.strftime('%y%m%d%H%M%SZ')
+    return value.strftime('%Y%m%d%H%M%SZ')
+
+
+def _write_file(path: Path, data: bytes):
+    """Replace the file atomically, so it is never seen half written."""
+    tmp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    with tmp_path.open('wb') as f:
+        f.write(data)
+    os.replace(str(tmp_path), str(path))
@@ -1,10 +1,16 @@
-from typing import Iterator
+from typing import Iterator, Optional
+from functools import partial
 import hvac
+import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 from ..csr import CsrPolicy
 from ..exceptions import BackendError
-from ..wrapper import Cert, PrivateKey, Crl, SerialNumber
+from ..wrapper import Cert, PrivateKey, Crl, StreamingCrl, SerialNumber
 from ..config import strtobool, Param
+from ..concurrency import map_concurrently
+from ..cache import CertCache
 from .interfaces import IBackend
 
 
@@ -18,6 +24,15 @@ class Backend(IBackend):
         Param('token', help='Token for accessing Vault'),
         Param('mount_point', default='pki', help="Mount point of the 'pki' secret backend"),
         Param('role', help='Role issuing certificates'),
+        Param('pool_size', default=10, convert=int,
+              help='Maximum number of connections kept open to Vault'),
+        Param('keep_alive', default=True, convert=strtobool,
+              help='Reuse connections between requests (HTTP keep-alive)?'),
+        Param('retries', default=3, convert=int,
+              help='Retries for failed connections and 5xx responses of idempotent requests'),
+        Param('backoff_factor', default=0.3, convert=float,
+              help='Exponential backoff factor between retries (seconds)'),
+        Param('timeout', default=30, convert=float, help='Request timeout (seconds)'),
     )
 
     setup_requires = (
@@ -28,10 +43,14 @@ class Backend(IBackend):
         Param('role_max_ttl', default=72, convert=int, help='Role max TTL (hours)')
     )
 
-    def __init__(self, url: str, token: str, mount_point: str, role: str):
+    def __init__(self, url: str, token: str, mount_point: str, role: str, pool_size: int=10,
+                 keep_alive: bool=True, retries: int=3, backoff_factor: float=0.3,
+                 timeout: float=30):
         if not url.startswith('http://') and not url.startswith('https://'):
             raise BackendError('URL needs to start with http:// or https://')
-        self._client = hvac.Client(url, token)
+        self._pool_size = pool_size
+        self._session = self._make_session(pool_size, keep_alive, retries, backoff_factor)
+        self._client = hvac.Client(url, token, timeout=timeout, session=self._session)
         # normalize mount_point to naked, so we can consistently use in strings
         self.mount_point = mount_point[:-1] if mount_point.endswith('/') else mount_point
         self.role = role
@@ -45,6 +64,38 @@ class Backend(IBackend):
         if not is_authenticated:
             raise BackendError('Invalid connection credentials!')
 
+    @staticmethod
+    def _make_session(pool_size, keep_alive, retries, backoff_factor):
+        """One session shared by every request, so connections and TLS sessions are reused."""
+        session = requests.Session()
+        # only idempotent requests are retried after a response, so certificates are never
+        # issued twice
+        retry = Retry(total=retries, backoff_factor=backoff_factor,
+                      status_forcelist=(500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def close(self):
+        self._session.close()
+
+    @property
+    def pool_stats(self) -> dict:
+        """Connection pool usage, to help choosing pool_size for the expected throughput."""
+        stats = {'pool_size': self._pool_size, 'opened_connections': 0,
+                 'idle_connections': 0, 'requests': 0}
+        poolmanager = self._session.get_adapter(self._client.url).poolmanager
+        for key in poolmanager.pools.keys():
+            pool = poolmanager.pools[key]
+            stats['opened_connections'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+            # the queue is prefilled with None placeholders
+            stats['idle_connections'] += sum(1 for conn in list(pool.pool.queue) if conn)
+        return stats
+
     def __str__(self):
         return f'<vault.Backend: {self._url}>\n'
 
@@ -112,18 +163,37 @@ class Backend(IBackend):
         return self._client.write(f'{self.mount_point}/revoke',
                                   serial_number=str(SerialNumber(serial)))
 
-    def list_certs(self) -> Iterator[Cert]:
+    def list_certs(self, workers: int=1, ordered: bool=True,
+                   cache: Optional[CertCache]=None) -> Iterator[Cert]:
         res = self._client.list(f'{self.mount_point}/certs')
-        for serial in res['data']['keys']:
-            yield self.get_cert(serial)
+        read_cert = partial(self._read_cert, header_only=True)
+        # every certificate is a separate request, workers limit how many run at the same time
+        yield from map_concurrently(read_cert, res['data']['keys'], workers, ordered)
 
     def get_cert(self, serial: str) -> Cert:
+        return self._read_cert(serial)
+
+    def _read_cert(self, serial: str, header_only: bool=False) -> Cert:
         serial_number = SerialNumber(serial)
         res = self._client.read(f'{self.mount_point}/cert/{serial_number}')
-        return Cert(res['data']['certificate'])
+        return Cert(res['data']['certificate'], header_only=header_only)
 
-    def get_crl(self) -> Crl:
+    def get_crl(self, streaming: bool=False) -> Crl:
         res = self._client.read(f'{self.mount_point}/cert/crl')
+        if streaming:
+            return StreamingCrl.from_pem(res['data']['certificate'])
+        return Crl(res['data']['certificate'])
+
+    def update_crl(self, delta: bool=False) -> Crl:
+        """Delta CRLs need to be enabled in the CRL config of the mount (auto_rebuild and
+        enable_delta), which needs Vault 1.12 or newer.
+        """
+        if delta:
+            self._client.read(f'{self.mount_point}/crl/rotate-delta')
+            res = self._client.read(f'{self.mount_point}/cert/delta-crl')
+        else:
+            self._client.read(f'{self.mount_point}/crl/rotate')
+            res = self._client.read(f'{self.mount_point}/cert/crl')
         return Crl(res['data']['certificate'])
 
     @property
@@ -0,0 +1,118 @@
+"""
+    Persistent cache of the certificate fields needed for listing, so certificate files
+    don't have to be parsed again when they haven't changed.
+"""
+import sqlite3
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from .wrapper import Cert, Name, SerialNumber
+from .concurrency import map_concurrently
+
+
+class CachedCert:
+    """Certificate fields read from the cache.
+    Accessing anything which is not cached loads and parses the certificate file.
+    """
+
+    __slots__ = ('_path', '_serial', '_common_name', '_not_before', '_not_after', '_cert')
+
+    def __init__(self, path: Path, serial: str, common_name: str, not_before: float,
+                 not_after: float):
+        self._path = path
+        self._serial = serial
+        self._common_name = common_name
+        self._not_before = not_before
+        self._not_after = not_after
+        self._cert = None
+
+    def _load(self):
+        if self._cert is None:
+            self._cert = Cert.from_file(self._path)
+        return self._cert
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __str__(self):
+        return str(self._load())
+
+    @property
+    def serial_number(self):
+        return SerialNumber(self._serial)
+
+    @property
+    def subject(self):
+        if self._cert is not None:
+            return self._cert.subject
+        return Name.from_dict({'common_name': self._common_name})
+
+    @property
+    def not_valid_before(self):
+        return datetime.fromtimestamp(self._not_before, timezone.utc)
+
+    @property
+    def not_valid_after(self):
+        return datetime.fromtimestamp(self._not_after, timezone.utc)
+
+
+class CertCache:
+    """Certificate fields stored in an SQLite database, keyed by file path.
+    An entry is only used when the modification time and size of the file are the same as
+    when it was cached.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._db = sqlite3.connect(str(path))
+        self._db.execute('CREATE TABLE IF NOT EXISTS cert_files ('
+                         'path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, serial TEXT, '
+                         'common_name TEXT, not_before REAL, not_after REAL)')
+
+    def close(self):
+        self._db.close()
+
+    def clear(self):
+        with self._db:
+            self._db.execute('DELETE FROM cert_files')
+
+    def _load_entries(self):
+        rows = self._db.execute('SELECT * FROM cert_files')
+        return {path: (mtime, size, fields) for path, mtime, size, *fields in rows}
+
+    def load_files(self, paths: Iterable[Path], workers: int=1,
+                   ordered: bool=True) -> Iterator[Cert]:
+        """Load certificates from the cache when possible, otherwise from the files.
+        Files are read in worker threads, the database is only used from the calling thread.
+        Entries of deleted files are removed after all of the files have been loaded.
+        """
+        entries = self._load_entries()
+
+        def load(path):
+            stat = path.stat()
+            entry = entries.get(str(path))
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                return path, CachedCert(path, *entry[2]), None
+            return path, Cert.from_file(path, header_only=True), stat
+
+        new_rows = []
+        deleted_paths = []
+        try:
+            for path, cert, stat in map_concurrently(load, paths, workers, ordered):
+                entries.pop(str(path), None)
+                if stat is not None:
+                    new_rows.append(self._make_row(path, cert, stat))
+                yield cert
+            # only when every file has been listed, the rest might not be needed anymore
+            deleted_paths = [(path,) for path in entries if not Path(path).exists()]
+        finally:
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO cert_files '
+                                     'VALUES (?, ?, ?, ?, ?, ?, ?)', new_rows)
+                self._db.executemany('DELETE FROM cert_files WHERE path = ?', deleted_paths)
+
+    @staticmethod
+    def _make_row(path, cert, stat):
+        return (str(path), stat.st_mtime_ns, stat.st_size, str(cert.serial_number),
+                cert.subject.common_name, cert.not_valid_before.timestamp(),
+                cert.not_valid_after.timestamp())
@@ -7,20 +7,119 @@ def cert():
     """Issue, sign, revoke and view certificates."""
 
 
+verbose_option = click.option('-v', '--verbose', is_flag=True,
+                              help='Show connection pool usage at the end, '
+                                   'to help choosing pool_size.')
+
+
+def _echo_pool_stats(backend):
+    # only backends with a connection pool have it
+    stats = getattr(backend, 'pool_stats', None)
+    if stats is not None:
+        click.echo(', '.join(f'{name}: {value}' for name, value in stats.items()), err=True)
+
+
 @cert.command()
+@click.option('-b', '--batch', 'batch_file', type=click.File(),
+              help='Issue certificates non-interactively for every subject in a CSV file '
+                   '(with a header row) or a JSON Lines file. Field names are: common_name, '
+                   'country, state, locality, org_name, org_unit, email. Use - for stdin.')
+@click.option('-f', '--format', 'batch_format', type=click.Choice(['csv', 'jsonl']),
+              help='Format of the batch file. Default: guessed from the file extension.')
+@click.option('-w', '--workers', default=8, type=click.IntRange(1, 100),
+              help='Number of certificates issued in parallel, if the backend supports it.')
+@verbose_option
 @ensure_config
-def issue(obj):
+@click.pass_context
+def issue(ctx, obj, batch_file, batch_format, workers, verbose):
     """Issue a new certificate."""
     from certmaestro.csr import CsrPolicy, CsrBuilder
     from certmaestro.config import CERT_FIELDS
 
     policy = obj.backend.get_csr_policy()
     defaults = obj.backend.get_csr_defaults()
+    if batch_file is not None:
+        fail_count = _issue_batch(obj.backend, policy, defaults, batch_file, batch_format,
+                                  workers)
+        if verbose:
+            _echo_pool_stats(obj.backend)
+        if fail_count > 0:
+            ctx.exit(2)
+        return
+
     csr = CsrBuilder(policy, defaults)
     for field, description in CERT_FIELDS:
         if csr.policy[field] == CsrPolicy.REQUIRED:
             csr[field] = click.prompt(description, default=csr[field])
     key, cert = obj.backend.issue_cert(csr)
+    if verbose:
+        _echo_pool_stats(obj.backend)
+
+
+def _issue_batch(backend, policy, defaults, batch_file, batch_format, workers) -> int:
+    """Returns the number of failed certificates."""
+    # the whole file is checked first, so an invalid row doesn't stop the batch halfway
+    csrs = [_make_csr(policy, defaults, subject)
+            for subject in _read_subjects(batch_file, batch_format)]
+    success_count = fail_count = 0
+    for result in backend.issue_certs(csrs, workers):
+        common_name = result.item.common_name
+        if result.succeeded:
+            key, cert = result.value
+            click.secho(f'Issued:    {common_name} ({cert.serial_number})', fg='green')
+            success_count += 1
+        else:
+            click.secho(f'Failed:    {common_name} ({result.error})', fg='red')
+            fail_count += 1
+
+    success_message = click.style(f'issued: {success_count}', fg='green')
+    failed_message = click.style(f'failed: {fail_count}', fg='red')
+    click.echo(f'Total: {success_count + fail_count}, {success_message}, {failed_message}')
+    return fail_count
+
+
+def _read_subjects(batch_file, batch_format):
+    import csv
+    import json
+
+    if batch_format is None:
+        is_jsonl = batch_file.name.endswith(('.jsonl', '.json'))
+        batch_format = 'jsonl' if is_jsonl else 'csv'
+
+    if batch_format == 'csv':
+        reader = csv.DictReader(batch_file)
+        for row in reader:
+            # values without a column in the header row are under the None key
+            if None in row:
+                raise click.BadParameter(f'line {reader.line_num}: more values than columns',
+                                         param_hint='--batch')
+            yield row
+    else:
+        for line_number, line in enumerate(batch_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise click.BadParameter(f'line {line_number}: {e}', param_hint='--batch')
+
+
+def _make_csr(policy, defaults, subject: dict):
+    from certmaestro.csr import CsrBuilder
+    from certmaestro.config import CERT_FIELDS
+
+    field_names = {field for field, _ in CERT_FIELDS}
+    unknown_fields = set(subject) - field_names
+    if unknown_fields:
+        fields = ', '.join(sorted(unknown_fields))
+        raise click.BadParameter(f'unknown fields: {fields}', param_hint='--batch')
+    # every CSR needs its own copy, CsrBuilder modifies the values
+    csr = CsrBuilder(policy, dict(defaults))
+    for field, value in subject.items():
+        # empty CSV cells mean the default value
+        if value:
+            csr[field] = value
+    return csr
 
 
 @cert.command()
@@ -47,25 +146,66 @@ def show_ca(obj):
 
 
 @cert.command('list')
+@click.option('-w', '--workers', default=8, type=click.IntRange(1, 100),
+              help='Number of certificates loaded in parallel.')
+@click.option('--unordered', is_flag=True,
+              help="Show certificates as soon as they are loaded, not in the backend's order.")
+@click.option('--no-cache', is_flag=True,
+              help="Don't use or update the certificate cache, parse every certificate.")
+@verbose_option
 @ensure_config
-def list_certs(obj):
+def list_certs(obj, workers, unordered, no_cache, verbose):
     """List issued certificates."""
     from tabulate import tabulate
-
-    cert_list = obj.backend.list_certs()
-    cert_table = ((c.subject.common_name, c.not_valid_before, c.not_valid_after, c.serial_number)
-                  for c in cert_list)
-    headers = ['Common Name', 'Not valid before', 'Not valid after', 'Serial Number']
-    click.echo(tabulate(cert_table, headers=headers, numalign='left'))
+    from certmaestro.cache import CertCache
+
+    cache = CertCache(obj.config.cache_path) if not no_cache else None
+    try:
+        cert_list = obj.backend.list_certs(workers=workers, ordered=not unordered, cache=cache)
+        cert_table = ((c.subject.common_name, c.not_valid_before, c.not_valid_after,
+                       c.serial_number) for c in cert_list)
+        headers = ['Common Name', 'Not valid before', 'Not valid after', 'Serial Number']
+        click.echo(tabulate(cert_table, headers=headers, numalign='left'))
+    finally:
+        if cache is not None:
+            cache.close()
+    if verbose:
+        _echo_pool_stats(obj.backend)
 
 
 @cert.command()
-@click.argument('serial_number')
+@click.argument('serial_numbers', nargs=-1)
+@click.option('-f', '--file', 'serials_file', type=click.File(),
+              help='Revoke every serial number in a file, one per line. Use - for stdin.')
+@click.option('-w', '--workers', default=8, type=click.IntRange(1, 100),
+              help='Number of certificates revoked in parallel, if the backend supports it.')
+@verbose_option
 @ensure_config
-def revoke(obj, serial_number):
-    """Revoke a certificate."""
-    result = obj.backend.revoke_cert(serial_number)
-    click.echo(result)
+@click.pass_context
+def revoke(ctx, obj, serial_numbers, serials_file, workers, verbose):
+    """Revoke certificates."""
+    serials = list(serial_numbers)
+    if serials_file is not None:
+        serials.extend(line.strip() for line in serials_file if line.strip())
+    if not serials:
+        raise click.UsageError('Give at least one serial number or a file with --file.')
+
+    success_count = fail_count = 0
+    for result in obj.backend.revoke_certs(serials, workers):
+        if result.succeeded:
+            click.secho(f'Revoked:   {result.item}', fg='green')
+            success_count += 1
+        else:
+            click.secho(f'Failed:    {result.item} ({result.error})', fg='red')
+            fail_count += 1
+
+    success_message = click.style(f'revoked: {success_count}', fg='green')
+    failed_message = click.style(f'failed: {fail_count}', fg='red')
+    click.echo(f'Total: {success_count + fail_count}, {success_message}, {failed_message}')
+    if verbose:
+        _echo_pool_stats(obj.backend)
+    if fail_count > 0:
+        ctx.exit(2)
 
 
 @cert.command()
@@ -11,6 +11,7 @@ class Obj:
         self.ctx = click.get_current_context()
         self.config = self._get_config()
         self.backend = self._get_backend()
+        self.ctx.call_on_close(self.backend.close)
 
     def _get_config(self):
         config_path = get_config_path(self.ctx)
@@ -56,8 +57,8 @@ def setup(ctx):
     all_backends = load_all_backends()
     BackendCls = _select_backend(all_backends)
     builder = _ask_backend_params(BackendCls)
-    backend = builder.setup_backend()
-    _make_new_config(builder, config_path)
+    with builder.setup_backend() as backend:
+        _make_new_config(builder, config_path)
     click.echo(f'Saved configuration to {config_path}')
     click.secho(f'Successfully initialized {backend.name}. You can issue certificates now!',
                 fg='green')
@@ -1,3 +1,4 @@
+import itertools
 import click
 from .config import ensure_config
 
@@ -8,25 +9,55 @@ def crl():
 
 
 @crl.command()
+@click.option('--delta', is_flag=True,
+              help='Generate a delta CRL, which contains only the changes since the last '
+                   'complete CRL.')
 @ensure_config
-def update(obj):
+def update(obj, delta):
     """Update the Certificate Revocation List (CRL)."""
+    crl = obj.backend.update_crl(delta=delta)
+    if delta:
+        click.echo(f'Delta CRL number:      {crl.crl_number}\n'
+                   f'Base CRL number:       {crl.delta_crl_indicator}\n'
+                   f'Changes:               {len(crl)}')
+    else:
+        click.echo(f'CRL number:            {crl.crl_number}\n'
+                   f'Revoked certificates:  {len(crl)}')
+    click.echo(f'Next update:           {crl.next_update}')
 
 
 @crl.command()
+@click.option('--pager', is_flag=True, help='Show revoked certificates in a pager.')
 @ensure_config
-def show(obj):
+def show(obj, pager):
     """Show the Certificate Revocation List."""
-    from tabulate import tabulate
+    crl = obj.backend.get_crl(streaming=True)
+    header = (f'Issuer Common Name:    {crl.issuer.common_name}\n'
+              f'This update:           {crl.this_update}\n'
+              f'Next update:           {crl.next_update}\n\n')
+    lines = _format_revoked_certs(crl)
+    if pager:
+        click.echo_via_pager(itertools.chain([header], lines))
+    else:
+        click.echo(header, nl=False)
+        for line in lines:
+            click.echo(line, nl=False)
 
-    crl = obj.backend.get_crl()
-    click.echo(f'Issuer Common Name:    {crl.issuer.common_name}')
-    click.echo(f'This update:           {crl.this_update}')
-    click.echo(f'Next update:           {crl.next_update}')
-    click.echo()
-    headers = ['Revocation Date', 'Invalidity Date', 'Reason', 'Serial Number']
-    revoked_certs = [(rc.revocation_date, rc.invalidity_date, rc.reason, rc.serial_number)
-                     for rc in crl]
-    click.echo(tabulate(revoked_certs, headers=headers))
-    if not revoked_certs:
-        click.echo('No certificates has been revoked yet!')
+
+def _format_revoked_certs(crl):
+    """Format revoked certificates one line at a time, so huge lists are never held in memory.
+    Column widths are fixed because we can't know the widest value in advance.
+    """
+    row_format = '{:<27}{:<27}{:<24}{}\n'
+    headers = ('Revocation Date', 'Invalidity Date', 'Reason', 'Serial Number')
+    yield row_format.format(*headers)
+    yield row_format.format(*('-' * len(header) for header in headers))
+    revoked_count = 0
+    for rc in crl:
+        reason = rc.reason.native if rc.reason is not None else ''
+        invalidity_date = rc.invalidity_date.native if rc.invalidity_date is not None else ''
+        yield row_format.format(str(rc.revocation_date), str(invalidity_date), reason,
+                                str(rc.serial_number))
+        revoked_count += 1
+    if not revoked_count:
+        yield 'No certificates has been revoked yet!\n'
@@ -0,0 +1,44 @@
+"""
+    Helpers for running blocking backend operations concurrently.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Iterable, Iterator
+
+
+def map_concurrently(func: Callable, items: Iterable, workers: int=1,
+                     ordered: bool=True) -> Iterator:
+    """Call func with every item from a pool of threads and yield the results.
+    At most 2 * workers calls are scheduled at once, so items can be a long or lazy iterable.
+    If ordered is False, results are yielded as soon as they are ready, otherwise in the same
+    order as items. With one worker, everything runs in the calling thread.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+
+    max_pending = workers * 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            pending = deque()
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for item in items:
+                pending.add(executor.submit(func, item))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from (future.result() for future in done)
+            for future in _as_completed(pending):
+                yield future.result()
+
+
+def _as_completed(futures):
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        yield from done
@@ -48,6 +48,10 @@ class Config:
         with self.path.open('w') as configfile:
             self._cfg.write(configfile)
 
+    @property
+    def cache_path(self):
+        return self.path.with_name('cache.sqlite3')
+
     @property
     def backend_name(self):
         return self._cfg.get('certmaestro', 'backend')
@@ -1,4 +1,8 @@
 import enum
+from oscrypto import asymmetric
+import asn1crypto.csr as asn1csr
+import asn1crypto.pem as asn1pem
+import asn1crypto.x509 as asn1x509
 
 
 class CsrPolicy(enum.Enum):
@@ -29,6 +33,51 @@ class CsrBuilder:
             return char + field_val
         return ''
 
+    # same order as in subject, with asn1crypto Name attribute names
+    _subject_fields = (
+        ('common_name', 'common_name'),
+        ('country', 'country_name'),
+        ('state', 'state_or_province_name'),
+        ('locality', 'locality_name'),
+        ('org_name', 'organization_name'),
+        ('org_unit', 'organizational_unit_name'),
+        ('email', 'email_address'),
+    )
+
+    @property
+    def subject_values(self):
+        """The same fields as subject, as a dict for asn1crypto's Name.build."""
+        rv = {}
+        for field, name_field in self._subject_fields:
+            field_val = self._values.get(field)
+            if field_val is not None and self.policy[field] == CsrPolicy.REQUIRED:
+                rv[name_field] = field_val
+        return rv
+
+    def build_pem(self, private_key_pem: str) -> str:
+        """Make a PEM encoded PKCS#10 Certificate Signing Request signed by the private key,
+        without running openssl req.
+        """
+        private_key = asymmetric.load_private_key(private_key_pem.encode())
+        request_info = asn1csr.CertificationRequestInfo({
+            'version': 'v1',
+            'subject': asn1x509.Name.build(self.subject_values),
+            'subject_pk_info': private_key.public_key.asn1,
+            'attributes': [],
+        })
+        if private_key.algorithm == 'rsa':
+            signature = asymmetric.rsa_pkcs1v15_sign(private_key, request_info.dump(), 'sha256')
+            signature_algorithm = 'sha256_rsa'
+        else:
+            signature = asymmetric.ecdsa_sign(private_key, request_info.dump(), 'sha256')
+            signature_algorithm = 'sha256_ecdsa'
+        request = asn1csr.CertificationRequest({
+            'certification_request_info': request_info,
+            'signature_algorithm': {'algorithm': signature_algorithm},
+            'signature': signature,
+        })
+        return asn1pem.armor('CERTIFICATE REQUEST', request.dump()).decode()
+
     @property
     def subject(self):
         return ''.join((
@@ -0,0 +1,55 @@
+"""
+    Locking shared files between processes.
+"""
+import os
+import fcntl
+import threading
+from pathlib import Path
+
+
+class FileLock:
+    """Exclusive lock on a lock file, held by one thread of one process at a time.
+    flock() only excludes other open file descriptions, so threads of the same process are
+    excluded by a thread lock. It can be entered again by the thread holding it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            # closing the file descriptor releases the lock
+            os.close(fd)
+        self._thread_lock.release()
+
+
+class NoLock:
+    """Stand-in for FileLock when locking is turned off."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
@@ -2,8 +2,10 @@
     Wrapper around oscrypto and asn1crypto modules for a nicer API.
 """
 import re
+import mmap
+import binascii
 from pathlib import Path
-from typing import NewType
+from typing import NewType, Optional
 from oscrypto.keys import parse_certificate
 import asn1crypto.x509 as asn1x509
 import asn1crypto.keys as asn1keys
@@ -14,37 +16,74 @@ import asn1crypto.crl as asn1crl
 SerialHex = NewType('SerialHex', str)
 
 
+class memoized_property:
+    """Property which is computed only once per instance.
+    The value is stored in the attribute named after the property with an underscore prefix,
+    which has to be listed in __slots__.
+    """
+
+    def __init__(self, func):
+        self._func = func
+        self._attr_name = '_' + func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        try:
+            return getattr(obj, self._attr_name)
+        except AttributeError:
+            value = self._func(obj)
+            setattr(obj, self._attr_name, value)
+            return value
+
+
 class SerialNumber:
+    """Certificate serial number stored as an int.
+    The hex and colon separated string forms are only computed when needed.
+    """
+
+    __slots__ = ('_value', '_hex', '_colonized')
 
     def __init__(self, serial: str):
         # might have 0x prefix, and/or colons
-        serial = serial.lower()
-        if serial.startswith('0x'):
-            serial = serial[2:]
-        serial = serial.replace(':', '')
-        serial = serial.replace('-', '')
-        serial = self._zero_prefix(serial)
-        serial = self.colonize(serial)
-        self._value = serial
+        serial = serial.replace(':', '').replace('-', '')
+        # int() handles the 0x prefix and upper case letters
+        self._value = int(serial, 16)
 
     @classmethod
     def from_int(cls, serial: int):
-        return cls(hex(serial))
+        obj = cls.__new__(cls)
+        obj._value = serial
+        return obj
 
     def __str__(self):
-        return self._value
+        return self.colonized
 
     def __repr__(self):
-        return f'<{self.__class__.__name__}: {self._value}>'
+        return f'<{self.__class__.__name__}: {self.colonized}>'
+
+    def __int__(self):
+        return self._value
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
         return self._value == other._value
 
+    def __hash__(self):
+        return hash(self._value)
+
+    @memoized_property
+    def hex(self) -> SerialHex:
+        return self._zero_prefix(format(self._value, 'x'))
+
+    @memoized_property
+    def colonized(self):
+        return self.colonize(self.hex)
+
     def as_hex(self, prefix=False):
-        serial_hex = self._value.replace(':', '')
-        return '0x' + serial_hex if prefix else serial_hex
+        return '0x' + self.hex if prefix else self.hex
 
     @staticmethod
     def _zero_prefix(serial: SerialHex):
@@ -58,6 +97,8 @@ class SerialNumber:
 
 
 class Name:
+    __slots__ = ('_name', '_native', '_formatted_lines')
+
     _map = {
         'C': 'country_name',
         'O': 'organization_name',
@@ -87,35 +128,88 @@ class Name:
     def from_dict(cls, values):
         return cls.from_asn1(asn1x509.Name.build(values))
 
+    @memoized_property
+    def native(self):
+        return self._name.native
+
     @property
     def common_name(self):
-        return self._name.native.get('common_name')
+        return self.native.get('common_name')
 
-    @property
+    @memoized_property
     def formatted_lines(self):
-        field_names = [asn1x509.NameType(field).human_friendly for field in self._name.native.keys()]
+        native = self.native
+        field_names = [asn1x509.NameType(field).human_friendly for field in native.keys()]
         max_length = max(len(field) for field in field_names)
         field_names = [f'{field}:'.ljust(max_length + 3) for field in field_names]
-        return (field + val for field, val in zip(field_names, self._name.native.values()))
+        return tuple(field + val for field, val in zip(field_names, native.values()))
 
 
 class FromFileMixin:
+    __slots__ = ()
+
     @classmethod
-    def from_file(cls, path):
-        return cls(Path(path).read_text())
+    def from_file(cls, path, **kwargs):
+        return cls(Path(path).read_text(), **kwargs)
+
+
+def _read_der_header(der: bytes, offset: int):
+    """Find the contents of the DER element starting at offset.
+    Returns the start and the end of the contents.
+    """
+    length = der[offset + 1]
+    offset += 2
+    # long form, the lower bits are the number of length bytes
+    if length & 0x80:
+        num_bytes = length & 0x7f
+        length = int.from_bytes(der[offset:offset + num_bytes], 'big')
+        offset += num_bytes
+    return offset, offset + length
 
 
 class Cert(FromFileMixin):
+    __slots__ = ('_asn1', '_der', '_pem_data', '_serial_number', '_not_valid_before',
+                 '_not_valid_after', '_version', '_issuer', '_subject', '_key_usages',
+                 '_extended_key_usages', '_public_key', '_signature', '_signature_algorithm')
 
-    def __init__(self, pem_data: str):
+    _pem_begin = '-----BEGIN CERTIFICATE-----'
+    _pem_end = '-----END CERTIFICATE-----'
+
+    def __init__(self, pem_data: str, header_only: bool=False):
+        """With header_only, only the serial number, validity and subject are decoded,
+        everything else is parsed when first needed. This is enough for listing certificates.
+        """
         # OpenSSL have an option to write readable text into the same file with PEM data
         start = self._find_start(pem_data)
         pem_data = pem_data[start:]
-        self._cert: asn1x509.Certificate = parse_certificate(pem_data.encode())
         self._pem_data = pem_data
+        if header_only and pem_data.startswith(self._pem_begin):
+            end = pem_data.index(self._pem_end)
+            # a2b_base64 skips new lines
+            self._der = binascii.a2b_base64(pem_data[len(self._pem_begin):end])
+            self._parse_header()
+        else:
+            self._asn1 = parse_certificate(pem_data.encode())
+
+    @classmethod
+    def from_der(cls, der, header_only: bool=False):
+        """Make a certificate from DER encoded bytes or a memoryview of them.
+        A memoryview is only copied when the full certificate is parsed.
+        """
+        obj = cls.__new__(cls)
+        obj._der = der
+        if header_only:
+            obj._parse_header()
+        else:
+            obj._asn1 = parse_certificate(bytes(der))
+        return obj
 
     def __str__(self):
-        return self._pem_data
+        return self.pem_data
+
+    @memoized_property
+    def pem_data(self):
+        return asn1pem.armor('CERTIFICATE', bytes(self._der)).decode()
 
     @staticmethod
     def _find_start(pem_data):
@@ -126,69 +220,155 @@ class Cert(FromFileMixin):
                 raise ValueError(f"This doesn't seem like a valid X509 Certificate: {pem_data}")
         return start
 
-    @property
+    def _parse_header(self):
+        """Decode the fields needed for listing from the TBSCertificate without parsing
+        the whole certificate. RFC 5280, 4.1:
+            TBSCertificate  ::=  SEQUENCE  {
+                version         [0]  EXPLICIT Version DEFAULT v1,
+                serialNumber         CertificateSerialNumber,
+                signature            AlgorithmIdentifier,
+                issuer               Name,
+                validity             Validity,
+                subject              Name,
+                ...
+        """
+        der = self._der
+        cert_start, _ = _read_der_header(der, 0)
+        offset, _ = _read_der_header(der, cert_start)
+        # explicitly tagged version
+        if der[offset] == 0xa0:
+            _, offset = _read_der_header(der, offset)
+        serial_start, offset = _read_der_header(der, offset)
+        self._serial_number = SerialNumber.from_int(
+            int.from_bytes(der[serial_start:offset], 'big', signed=True))
+        # signature and issuer are skipped
+        _, offset = _read_der_header(der, offset)
+        _, offset = _read_der_header(der, offset)
+        validity_start = offset
+        _, offset = _read_der_header(der, offset)
+        validity = asn1x509.Validity.load(bytes(der[validity_start:offset]))
+        self._not_valid_before = validity['not_before'].native
+        self._not_valid_after = validity['not_after'].native
+        subject_start = offset
+        _, offset = _read_der_header(der, offset)
+        self._subject = Name.from_asn1(asn1x509.Name.load(bytes(der[subject_start:offset])))
+
+    @memoized_property
+    def asn1(self) -> asn1x509.Certificate:
+        return parse_certificate(bytes(self._der))
+
+    @memoized_property
     def serial_number(self):
-        return SerialNumber.from_int(self._cert.serial_number)
+        return SerialNumber.from_int(self.asn1.serial_number)
 
-    @property
+    @memoized_property
     def not_valid_before(self):
-        return self._cert['tbs_certificate']['validity']['not_before'].native
+        return self.asn1['tbs_certificate']['validity']['not_before'].native
 
-    @property
+    @memoized_property
     def not_valid_after(self):
-        return self._cert['tbs_certificate']['validity']['not_after'].native
+        return self.asn1['tbs_certificate']['validity']['not_after'].native
 
-    @property
+    @memoized_property
     def version(self):
-        return self._cert['tbs_certificate']['version'].native
+        return self.asn1['tbs_certificate']['version'].native
 
-    @property
+    @memoized_property
     def issuer(self):
-        return Name.from_asn1(self._cert.issuer)
+        return Name.from_asn1(self.asn1.issuer)
 
-    @property
+    @memoized_property
     def subject(self):
-        return Name.from_asn1(self._cert.subject)
+        return Name.from_asn1(self.asn1.subject)
 
     @property
     def ca(self):
-        return self._cert.ca
+        return self.asn1.ca
 
     @property
     def max_path_length(self):
-        return self._cert.max_path_length
+        return self.asn1.max_path_length
 
-    @property
+    @memoized_property
     def key_usages(self):
-        yield from self._convert_values(self._cert.key_usage_value)
+        return self._convert_values(self.asn1.key_usage_value)
 
-    @property
+    @memoized_property
     def extended_key_usages(self):
-        yield from self._convert_values(self._cert.extended_key_usage_value)
+        return self._convert_values(self.asn1.extended_key_usage_value)
 
     def _convert_values(self, asn1type):
         """Reformat the words as defined in RFC5280. E.g. keyEncipherment."""
         if asn1type is None:
-            return None
-        values = asn1type.native
-        for usage in values:
+            return ()
+        rv = []
+        for usage in asn1type.native:
             words = usage.split('_')
-            yield ''.join(words[0:1] + [w.title() for w in words[1:]])
+            rv.append(''.join(words[0:1] + [w.title() for w in words[1:]]))
+        return tuple(rv)
 
-    @property
+    @memoized_property
     def public_key(self):
-        return PublicKey.from_asn1(self._cert.public_key)
+        return PublicKey.from_asn1(self.asn1.public_key)
 
-    @property
+    @memoized_property
     def signature(self):
-        return ':'.join(hex(i)[2:].zfill(2) for i in self._cert.signature)
+        return ':'.join(hex(i)[2:].zfill(2) for i in self.asn1.signature)
 
-    @property
+    @memoized_property
     def signature_algorithm(self):
-        return self._cert['signature_algorithm']['algorithm'].native
+        return self.asn1['signature_algorithm']['algorithm'].native
+
+
+class CertBundle:
+    """Certificates from a file of concatenated PEM or DER encoded certificates,
+    e.g. a CA bundle or an exported archive.
+    The file is memory mapped and certificates are decoded one by one while iterating. DER
+    certificates are memoryview slices of the map, so the map stays open as long as any of
+    them are alive.
+    """
+
+    _pem_begin = Cert._pem_begin.encode()
+    _pem_end = Cert._pem_end.encode()
+
+    def __init__(self, path, header_only: bool=False):
+        self._path = Path(path)
+        self._header_only = header_only
+
+    def __iter__(self):
+        if self._path.stat().st_size == 0:
+            return iter(())
+        with self._path.open('rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # every DER certificate starts with a SEQUENCE tag
+        if mm[0] == 0x30:
+            return self._iter_der(mm)
+        return self._iter_pem(mm)
+
+    def _iter_pem(self, mm):
+        view = memoryview(mm)
+        start = mm.find(self._pem_begin)
+        while start != -1:
+            body_start = start + len(self._pem_begin)
+            body_end = mm.find(self._pem_end, body_start)
+            if body_end == -1:
+                raise ValueError(f'Unterminated PEM certificate at byte {start} in {self._path}')
+            # a2b_base64 skips new lines
+            der = binascii.a2b_base64(view[body_start:body_end])
+            yield Cert.from_der(der, self._header_only)
+            start = mm.find(self._pem_begin, body_end)
+
+    def _iter_der(self, mm):
+        view = memoryview(mm)
+        offset = 0
+        while offset < len(view):
+            _, end = _read_der_header(view, offset)
+            yield Cert.from_der(view[offset:end], self._header_only)
+            offset = end
 
 
 class PrivateKey(FromFileMixin):
+    __slots__ = ('_pem_data',)
 
     def __init__(self, pem_data: str):
         self._pem_data = pem_data
@@ -198,6 +378,7 @@ class PrivateKey(FromFileMixin):
 
 
 class PublicKey:
+    __slots__ = ('_public_key', '_native', '_modulus')
 
     @classmethod
     def from_asn1(cls, public_key: asn1keys.PublicKeyInfo):
@@ -205,9 +386,13 @@ class PublicKey:
         obj._public_key = public_key
         return obj
 
-    @property
+    @memoized_property
+    def native(self):
+        return self._public_key['public_key'].native
+
+    @memoized_property
     def modulus(self):
-        hex_modulus = hex(self._public_key['public_key'].native['modulus'])[2:]
+        hex_modulus = hex(self.native['modulus'])[2:]
         # http://stackoverflow.com/questions/15953631/rsa-modulus-prefaced-by-0x00
         return '00:' + SerialNumber.colonize(hex_modulus)
 
@@ -221,11 +406,11 @@ class PublicKey:
 
     @property
     def exponent(self):
-        return self._public_key['public_key'].native['public_exponent']
+        return self.native['public_exponent']
 
     @property
     def hex_exponent(self):
-        return hex(self._public_key['public_key'].native['public_exponent'])
+        return hex(self.native['public_exponent'])
 
 
 class RevokedCert:
@@ -254,6 +439,7 @@ class RevokedCert:
 
 
 class Crl(FromFileMixin):
+    __slots__ = ('_crl', '_revoked_index')
 
     def __init__(self, crl_pem: str):
         type_name, headers, der_bytes = asn1pem.unarmor(crl_pem.encode())
@@ -272,6 +458,31 @@ class Crl(FromFileMixin):
         return iter(RevokedCert.from_asn1(c)
                     for c in self._crl['tbs_cert_list']['revoked_certificates'])
 
+    def __len__(self):
+        return len(self._crl['tbs_cert_list']['revoked_certificates'])
+
+    @memoized_property
+    def revoked_index(self):
+        """Revoked certificates by serial number as int."""
+        return {c['user_certificate'].native: c
+                for c in self._crl['tbs_cert_list']['revoked_certificates']}
+
+    @staticmethod
+    def _serial_to_int(serial):
+        if not isinstance(serial, SerialNumber):
+            serial = SerialNumber(serial)
+        return int(serial)
+
+    def get_revoked(self, serial) -> Optional['RevokedCert']:
+        """Find the revoked certificate entry by serial number, None if it's not revoked."""
+        revoked_cert = self.revoked_index.get(self._serial_to_int(serial))
+        if revoked_cert is None:
+            return None
+        return RevokedCert.from_asn1(revoked_cert)
+
+    def is_revoked(self, serial) -> bool:
+        return self._serial_to_int(serial) in self.revoked_index
+
     @property
     def this_update(self):
         return self._crl['tbs_cert_list']['this_update'].native
@@ -283,3 +494,99 @@ class Crl(FromFileMixin):
     @property
     def issuer(self):
         return Name.from_asn1(self._crl['tbs_cert_list']['issuer'])
+
+    @property
+    def crl_number(self) -> Optional[int]:
+        value = self._crl.crl_number_value
+        return value.native if value is not None else None
+
+    @property
+    def delta_crl_indicator(self) -> Optional[int]:
+        """CRL number of the complete CRL this delta CRL is based on, None if it's complete."""
+        value = self._crl.delta_crl_indicator_value
+        return value.native if value is not None else None
+
+
+class StreamingCrl:
+    """Certificate Revocation List which decodes revoked certificates one by one while iterating,
+    instead of loading the whole list at once like Crl. Meant for very large CRLs.
+    """
+
+    # DER tags in TBSCertList
+    _INTEGER = 0x02
+    _SEQUENCE = 0x30
+
+    def __init__(self, der):
+        self._der = der
+        view = memoryview(der)
+        offset, _ = _read_der_header(view, 0)
+        # TBSCertList, RFC 5280 5.1:
+        #   version  Version OPTIONAL, signature, issuer, thisUpdate, nextUpdate Time OPTIONAL,
+        #   revokedCertificates  SEQUENCE OF SEQUENCE OPTIONAL, crlExtensions [0] OPTIONAL
+        offset, self._tbs_end = _read_der_header(view, offset)
+        if view[offset] == self._INTEGER:
+            _, offset = _read_der_header(view, offset)
+        _, offset = _read_der_header(view, offset)
+        issuer_start = offset
+        _, offset = _read_der_header(view, offset)
+        self._issuer_der = bytes(view[issuer_start:offset])
+        times = []
+        # thisUpdate and the optional nextUpdate are both either UTCTime or GeneralizedTime
+        while offset < self._tbs_end and view[offset] in (0x17, 0x18) and len(times) < 2:
+            time_start = offset
+            _, offset = _read_der_header(view, offset)
+            times.append(bytes(view[time_start:offset]))
+        self._times = times
+        if offset < self._tbs_end and view[offset] == self._SEQUENCE:
+            self._revoked_start, self._revoked_end = _read_der_header(view, offset)
+        else:
+            self._revoked_start = self._revoked_end = offset
+
+    @classmethod
+    def from_file(cls, path):
+        """Memory map a PEM or DER encoded CRL file.
+        DER files are not copied, PEM files are decoded into memory first.
+        """
+        with Path(path).open('rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # a DER CertificateList starts with a SEQUENCE tag
+        if mm[0] == cls._SEQUENCE:
+            return cls(mm)
+        return cls(cls._unarmor(mm))
+
+    @classmethod
+    def from_pem(cls, crl_pem: str):
+        return cls(cls._unarmor(crl_pem.encode()))
+
+    @staticmethod
+    def _unarmor(pem_data) -> bytes:
+        begin = pem_data.find(b'-----BEGIN X509 CRL-----')
+        if begin == -1:
+            raise ValueError('This does not seem like a Certificate Revocation List.')
+        body_start = pem_data.find(b'\n', begin) + 1
+        body_end = pem_data.find(b'-----END X509 CRL-----', body_start)
+        # a2b_base64 skips new lines
+        return binascii.a2b_base64(memoryview(pem_data)[body_start:body_end])
+
+    def __iter__(self):
+        view = memoryview(self._der)
+        offset = self._revoked_start
+        while offset < self._revoked_end:
+            start = offset
+            _, offset = _read_der_header(view, offset)
+            revoked_cert = asn1crl.RevokedCertificate.load(bytes(view[start:offset]))
+            yield RevokedCert.from_asn1(revoked_cert)
+
+    @property
+    def this_update(self):
+        return asn1x509.Time.load(self._times[0]).native
+
+    @property
+    def next_update(self):
+        if len(self._times) < 2:
+            return None
+        return asn1x509.Time.load(self._times[1]).native
+
+    @property
+    def issuer(self):
+        return Name.from_asn1(asn1x509.Name.load(self._issuer_der))
@@ -4,6 +4,7 @@ from setuptools import setup, find_packages
 install_requires = [
     'click',
     'oscrypto',
+    'certbuilder',
     'certifi',
     'hvac[parser]',
     'tabulate',
@@ -11,6 +12,10 @@ install_requires = [
     'Jinja2',
 ]
 
+extras_require = {
+    'asyncio': ['aiohttp'],
+}
+
 console_scripts = [
     'certmaestro = certmaestro.cli.groups:main',
 ]
@@ -35,5 +40,6 @@ setup(
     license='MIT',
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require=extras_require,
     entry_points={'console_scripts': console_scripts}
 )
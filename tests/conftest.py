@@ -0,0 +1,22 @@
+from pathlib import Path
+import pytest
+from certbuilder import CertificateBuilder
+from oscrypto import asymmetric
+
+
+@pytest.fixture(scope='session')
+def cert_pem():
+    return (Path(__file__).parent / 'data' / 'cert.pem').read_text()
+
+
+@pytest.fixture
+def make_ca():
+    """Write a new self-signed EC CA certificate and its private key."""
+    def make_ca(cert_path, key_path, subject=None):
+        ca_public, ca_private = asymmetric.generate_pair('ec', curve='secp256r1')
+        builder = CertificateBuilder(subject or {'common_name': 'Test CA'}, ca_public)
+        builder.self_signed = True
+        builder.ca = True
+        cert_path.write_bytes(asymmetric.dump_certificate(builder.build(ca_private)))
+        key_path.write_bytes(asymmetric.dump_private_key(ca_private, None))
+    return make_ca
@@ -0,0 +1,51 @@
+import shutil
+from pathlib import Path
+import pytest
+from certmaestro.backends.openssl import Backend
+from certmaestro.exceptions import BackendError
+
+CONFIG = '''
+[ ca ]
+default_ca = CA_default
+
+[ CA_default ]
+certs = .
+new_certs_dir = .
+database = index.txt
+certificate = ca.pem
+policy = policy_anything
+
+[ policy_anything ]
+commonName = supplied
+'''
+
+
+@pytest.fixture
+def make_backend(tmp_path):
+    openssl = shutil.which('openssl')
+    if openssl is None:
+        pytest.skip('openssl is not installed')
+    (tmp_path / 'openssl.cnf').write_text(CONFIG)
+    (tmp_path / 'index.txt').write_text('')
+
+    def make_backend(**kwargs):
+        return Backend(Path(openssl), tmp_path / 'openssl.cnf', tmp_path, tmp_path / 'crl.pem',
+                       **kwargs)
+    return make_backend
+
+
+@pytest.mark.parametrize('generate_in_process', [True, False])
+def test_invalid_ec_key_size(make_backend, generate_in_process):
+    with pytest.raises(BackendError, match='EC key size'):
+        make_backend(key_algorithm='ec', key_bit_size=2048,
+                     generate_in_process=generate_in_process)
+
+
+def test_invalid_key_algorithm(make_backend):
+    with pytest.raises(BackendError, match='key algorithm'):
+        make_backend(key_algorithm='dsa')
+
+
+def test_ec_key_size(make_backend):
+    with make_backend(key_algorithm='ec', key_bit_size=384) as backend:
+        assert backend._key_bit_size == 384
@@ -0,0 +1,71 @@
+import pytest
+from certmaestro.backends.openssl import OpenSSLConfig
+from certmaestro.exceptions import BackendError
+
+
+CONFIG = '''
+[ ca ]
+default_ca = CA_default
+
+[ CA_default ]
+dir = ./demoCA
+certs = $dir/certs
+new_certs_dir = $dir/newcerts
+database = $dir/index.txt
+certificate = $ENV::CA_CERT
+policy = policy_match
+x509_extensions = usr_cert
+
+[ policy_match ]
+countryName = match
+commonName = supplied
+
+[ usr_cert ]
+basicConstraints = CA:FALSE
+
+[ req ]
+distinguished_name = req_distinguished_name
+
+[ req_distinguished_name ]
+countryName_default = HU
+'''
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / 'openssl.cnf'
+    path.write_text(CONFIG)
+    return path
+
+
+def test_values_are_resolved(config_file, tmp_path):
+    config = OpenSSLConfig.from_file(config_file, tmp_path, env={'CA_CERT': 'ca.pem'})
+
+    assert config.new_certs_dir == tmp_path / 'demoCA' / 'newcerts'
+    assert config.certs_dir == tmp_path / 'demoCA' / 'certs'
+    assert config.database == tmp_path / 'demoCA' / 'index.txt'
+    assert config.certificate == tmp_path / 'ca.pem'
+    assert dict(config.policy) == {'countryname': 'match', 'commonname': 'supplied'}
+    assert config.distinguished_name['countryname_default'] == 'HU'
+    assert dict(config.x509_extensions) == {'basicconstraints': 'CA:FALSE'}
+    assert config.oid_section is None
+
+
+def test_oid_section_before_first_section(config_file, tmp_path):
+    config_file.write_text('oid_section = new_oids\n' + CONFIG + '[ new_oids ]\n')
+    config = OpenSSLConfig.from_file(config_file, tmp_path, env={'CA_CERT': 'ca.pem'})
+    assert config.oid_section == 'new_oids'
+
+
+def test_snapshot_is_immutable(config_file, tmp_path):
+    config = OpenSSLConfig.from_file(config_file, tmp_path, env={'CA_CERT': 'ca.pem'})
+    with pytest.raises(AttributeError):
+        config.database = tmp_path
+    with pytest.raises(TypeError):
+        config.ca['database'] = 'other.txt'
+
+
+def test_missing_section(config_file, tmp_path):
+    config_file.write_text(CONFIG.replace('policy_match ]', 'policy_other ]'))
+    with pytest.raises(BackendError, match='policy_match'):
+        OpenSSLConfig.from_file(config_file, tmp_path, env={'CA_CERT': 'ca.pem'})
@@ -0,0 +1,103 @@
+import shutil
+import subprocess
+import pytest
+from oscrypto import asymmetric
+from certmaestro.backends.delta_crl import DeltaCrlGenerator
+from certmaestro.backends.openssl import OpenSSLDbParser
+from certmaestro.exceptions import BackendError
+from certmaestro.locking import FileLock
+from certmaestro.wrapper import Crl
+
+CONFIG = '''
+[ ca ]
+default_ca = CA_default
+
+[ CA_default ]
+database = index.txt
+certificate = ca.pem
+private_key = ca.key
+crlnumber = crlnumber
+default_crl_days = 7
+default_md = sha256
+'''
+
+CA_SECTION = {
+    'database': 'index.txt',
+    'certificate': 'ca.pem',
+    'private_key': 'ca.key',
+    'crlnumber': 'crlnumber',
+    'default_crl_days': '7',
+    'default_md': 'sha256',
+}
+
+
+def db_line(status, serial, revocation=''):
+    return f'{status}\t301231000000Z\t{revocation}\t{serial}\tunknown\t/CN={serial}.example.com\n'
+
+
+@pytest.fixture
+def ca_dir(tmp_path, make_ca):
+    openssl = shutil.which('openssl')
+    if openssl is None:
+        pytest.skip('openssl is not installed')
+    make_ca(tmp_path / 'ca.pem', tmp_path / 'ca.key')
+    (tmp_path / 'crlnumber').write_text('1000\n')
+    (tmp_path / 'openssl.cnf').write_text(CONFIG)
+    (tmp_path / 'index.txt').write_text(
+        db_line('R', '01', '200101000000Z,keyCompromise') +
+        db_line('V', '02') +
+        db_line('R', '03', '200102000000Z,certificateHold')
+    )
+    subprocess.run([openssl, 'ca', '-config', 'openssl.cnf', '-gencrl', '-out', 'crl.pem'],
+                   cwd=str(tmp_path), check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return tmp_path
+
+
+def make_generator(ca_dir, ca_section=CA_SECTION):
+    db = OpenSSLDbParser(ca_dir / 'index.txt')
+    return DeltaCrlGenerator(ca_section, ca_dir, db, FileLock(ca_dir / 'index.txt.lock'))
+
+
+def test_delta_crl(ca_dir):
+    (ca_dir / 'index.txt').write_text(
+        db_line('R', '01', '200101000000Z,keyCompromise') +
+        db_line('R', '02', '200103000000Z,superseded') +
+        db_line('V', '03')
+    )
+    generator = make_generator(ca_dir)
+    crl = generator.generate(ca_dir / 'crl.pem', ca_dir / 'crl-delta.pem')
+
+    assert (crl.crl_number, crl.delta_crl_indicator) == (0x1001, 0x1000)
+    assert (ca_dir / 'crlnumber').read_text() == '1002\n'
+    assert [(int(rc.serial_number), rc.reason.native) for rc in crl] == \
+        [(2, 'superseded'), (3, 'remove_from_crl')]
+    assert Crl.from_file(ca_dir / 'crl-delta.pem').crl_number == 0x1001
+
+    ca_cert = asymmetric.load_certificate(str(ca_dir / 'ca.pem'))
+    asymmetric.ecdsa_verify(ca_cert.public_key, crl._crl.signature,
+                            crl._crl['tbs_cert_list'].dump(), 'sha256')
+
+
+def test_hold_changed_to_key_compromise(ca_dir):
+    (ca_dir / 'index.txt').write_text(
+        db_line('R', '01', '200101000000Z,keyCompromise') +
+        db_line('V', '02') +
+        db_line('R', '03', '200104000000Z,keyCompromise')
+    )
+    crl = make_generator(ca_dir).generate(ca_dir / 'crl.pem', ca_dir / 'crl-delta.pem')
+    assert [(int(rc.serial_number), rc.reason.native) for rc in crl] == \
+        [(3, 'key_compromise')]
+
+
+def test_nothing_changed(ca_dir):
+    generator = make_generator(ca_dir)
+    crl = generator.generate(ca_dir / 'crl.pem', ca_dir / 'crl-delta.pem')
+    assert len(crl) == 0
+    assert crl.delta_crl_indicator == 0x1000
+
+
+def test_crlnumber_is_required(ca_dir):
+    ca_section = dict(CA_SECTION)
+    del ca_section['crlnumber']
+    with pytest.raises(BackendError, match='crlnumber'):
+        make_generator(ca_dir, ca_section)
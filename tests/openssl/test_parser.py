@@ -1,5 +1,7 @@
+import os
 import pytest
 from pathlib import Path
+from datetime import datetime, timezone
 from certmaestro.backends.openssl import OpenSSLDbParser
 from certmaestro.wrapper import Name
 
@@ -29,3 +31,87 @@ class TestDatabaseParser:
     def test_get_by_serial_on_single_entry(self, data_dir):
         db = OpenSSLDbParser(data_dir / 'one_valid.txt')
         assert db.get_by_serial_number('01').name == Name('/C=HU/L=Budapest/O=asf')
+
+    def test_get_by_serial_number_not_found(self, data_dir):
+        db = OpenSSLDbParser(data_dir / 'one_valid.txt')
+        assert db.get_by_serial_number('02') is None
+
+    def test_get_by_serial_number_sees_new_entries(self, tmp_path, data_dir):
+        db_file = tmp_path / 'index.txt'
+        db_file.write_bytes((data_dir / 'one_valid.txt').read_bytes())
+        db = OpenSSLDbParser(db_file)
+        assert db.get_by_serial_number('0x0A') is None
+        with db_file.open('a') as f:
+            f.write('V\t180312100706Z\t\t0A\tunknown\t/C=HU/L=Budapest/O=second\n')
+        assert db.get_by_serial_number('0x0A').name == Name('/C=HU/L=Budapest/O=second')
+
+    def test_iteration_sees_appended_entries(self, tmp_path, data_dir):
+        db_file = tmp_path / 'index.txt'
+        db_file.write_bytes((data_dir / 'one_valid.txt').read_bytes())
+        db = OpenSSLDbParser(db_file)
+        assert len(list(db)) == 1
+        with db_file.open('a') as f:
+            f.write('V\t180312100706Z\t\t0A\tunknown\t/C=HU/L=Budapest/O=second\n')
+        entries = list(db)
+        assert len(entries) == 2
+        assert entries[1].name == Name('/C=HU/L=Budapest/O=second')
+
+    def test_rewritten_database_is_parsed_again(self, tmp_path):
+        db_file = tmp_path / 'index.txt'
+        db_file.write_text('V\t180312100706Z\t\t01\tunknown\t/C=HU/L=Budapest/O=asf\n')
+        db = OpenSSLDbParser(db_file)
+        assert [e.status for e in db] == ['V']
+        db_file.write_text('R\t180312100706Z\t170312100706Z\t01\tunknown\t/C=HU/L=Budapest/O=asf\n'
+                           'V\t180312100706Z\t\t02\tunknown\t/C=HU/L=Budapest/O=asf\n')
+        assert [e.status for e in db] == ['R', 'V']
+
+    def test_rewrite_of_the_same_size_is_parsed_again(self, tmp_path):
+        db_file = tmp_path / 'index.txt'
+        db_file.write_text('V\t180312100706Z\t\t01\tunknown\t/C=HU/L=Budapest/O=asf\n')
+        db = OpenSSLDbParser(db_file)
+        assert [e.status for e in db] == ['V']
+        # same as openssl ca -updatedb
+        db_file.write_text('E\t180312100706Z\t\t01\tunknown\t/C=HU/L=Budapest/O=asf\n')
+        # the modification time might not change that fast
+        mtime_ns = db_file.stat().st_mtime_ns + 10 ** 9
+        os.utime(str(db_file), ns=(mtime_ns, mtime_ns))
+        assert [e.status for e in db] == ['E']
+
+    def test_early_row_changed_while_appending(self, tmp_path):
+        db_file = tmp_path / 'index.txt'
+        lines = [f'V\t180312100706Z\t\t{serial:06X}\tunknown\t/CN=host{serial}.example.com\n'
+                 for serial in range(1, 5001)]
+        db_file.write_text(''.join(lines))
+        db = OpenSSLDbParser(db_file)
+        assert db.get_by_serial_number('000001').status == 'V'
+        # bigger than any window at the end of the file
+        assert db_file.stat().st_size > 256 * 1024
+        lines[0] = lines[0].replace('V', 'E', 1)
+        lines.append('V\t180312100706Z\t\t001389\tunknown\t/CN=new.example.com\n')
+        db_file.write_text(''.join(lines))
+        mtime_ns = db_file.stat().st_mtime_ns + 10 ** 9
+        os.utime(str(db_file), ns=(mtime_ns, mtime_ns))
+        assert db.get_by_serial_number('000001').status == 'E'
+        assert db.get_by_serial_number('001389').name == Name('/CN=new.example.com')
+
+    def test_old_map_stays_usable_after_append(self, tmp_path, data_dir):
+        db_file = tmp_path / 'index.txt'
+        db_file.write_bytes((data_dir / 'one_valid.txt').read_bytes())
+        db = OpenSSLDbParser(db_file)
+        entry, = db
+        # as if another thread was reading it
+        old_map = db._columns.mm
+        with db_file.open('a') as f:
+            f.write('V\t180312100706Z\t\t0A\tunknown\t/C=HU/L=Budapest/O=second\n')
+        assert len(list(db)) == 2
+        assert not old_map.closed
+        assert entry.filename == 'unknown'
+
+    def test_entry_columns(self, data_dir):
+        entry, = OpenSSLDbParser(data_dir / 'one_valid.txt')
+        assert entry.status == 'V'
+        assert entry.expiration == datetime(2018, 3, 12, 10, 7, 6, tzinfo=timezone.utc)
+        assert entry.revocation == ''
+        assert str(entry.serial_number) == '01'
+        assert entry.filename == 'unknown'
+        assert entry.name == Name('/C=HU/L=Budapest/O=asf')
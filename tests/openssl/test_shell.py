@@ -0,0 +1,60 @@
+import os
+import shutil
+from subprocess import CalledProcessError
+import pytest
+from certmaestro.backends.shell import OpenSSLShell, OpenSSLShellPool
+from certmaestro.exceptions import BackendError
+
+# the interactive mode needs OpenSSL 1.x, which might not be the default one
+OPENSSL = os.environ.get('CERTMAESTRO_TEST_OPENSSL') or shutil.which('openssl')
+
+
+@pytest.fixture
+def shell(tmp_path):
+    if OPENSSL is None:
+        pytest.skip('openssl is not installed')
+    try:
+        shell = OpenSSLShell(OPENSSL, tmp_path)
+    except BackendError as e:
+        pytest.skip(str(e))
+    yield shell
+    shell.close()
+
+
+def test_run(shell):
+    assert shell.run('version').startswith('OpenSSL 1.')
+    assert len(shell.run('rand', '-hex', '4').strip()) == 8
+
+
+def test_failing_command(shell):
+    with pytest.raises(CalledProcessError) as excinfo:
+        shell.run('x509', '-in', '/nonexistent')
+    assert 'error in x509' in excinfo.value.stderr
+    # the same process can still be used
+    assert shell.running
+    assert shell.run('version').startswith('OpenSSL 1.')
+
+
+def test_input_and_quoting(shell, tmp_path):
+    config_file = tmp_path / 'openssl.cnf'
+    config_file.write_text('[ req ]\ndistinguished_name = dn\n[ dn ]\n')
+    key_pem = shell.run('genpkey', '-algorithm', 'EC', '-pkeyopt', 'ec_paramgen_curve:P-256')
+    csr_pem = shell.run('req', '-config', str(config_file), '-new', '-key', '/dev/stdin',
+                        '-subj', '/CN=a b/O=Example', input=key_pem)
+    subject = shell.run('req', '-config', str(config_file), '-noout', '-subject',
+                        '-in', '/dev/stdin', input=csr_pem)
+    assert subject.strip() == 'subject=CN = a b, O = Example'
+
+
+def test_timeout(shell):
+    shell.timeout = 0.0001
+    with pytest.raises(BackendError, match='timed out'):
+        shell.run('genrsa', '4096')
+    assert not shell.running
+
+
+def test_pool_replaces_broken_shell(shell, tmp_path):
+    pool = OpenSSLShellPool(2, OPENSSL, tmp_path)
+    pool._idle[0].close()
+    assert pool.run('version').startswith('OpenSSL 1.')
+    pool.close()
@@ -0,0 +1,94 @@
+import pytest
+from oscrypto import asymmetric
+from certmaestro.backends.openssl import OpenSSLDbParser
+from certmaestro.backends.signer import InProcessSigner
+from certmaestro.backends.keypool import generate_private_key
+from certmaestro.csr import CsrBuilder, CsrPolicy
+from certmaestro.exceptions import BackendError
+from certmaestro.locking import FileLock
+from certmaestro.wrapper import Cert
+
+
+@pytest.fixture
+def ca_dir(tmp_path, make_ca):
+    make_ca(tmp_path / 'ca.pem', tmp_path / 'ca.key',
+            {'country_name': 'HU', 'common_name': 'Test CA'})
+    (tmp_path / 'index.txt').write_text('')
+    (tmp_path / 'serial').write_text('0F\n')
+    (tmp_path / 'newcerts').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def make_signer(ca_dir):
+    def make_signer(unique_subject='no', extensions=None):
+        ca_section = {
+            'certificate': 'ca.pem',
+            'private_key': 'ca.key',
+            'database': 'index.txt',
+            'serial': 'serial',
+            'new_certs_dir': 'newcerts',
+            'default_days': '10',
+            'default_md': 'sha256',
+            'unique_subject': unique_subject,
+        }
+        policy_section = {'countryname': 'match', 'commonname': 'supplied'}
+        db = OpenSSLDbParser(ca_dir / 'index.txt')
+        lock = FileLock(ca_dir / 'index.txt.lock')
+        return InProcessSigner(ca_section, policy_section, extensions, ca_dir, db, lock)
+    return make_signer
+
+
+def make_csr_pem(country='HU', common_name='vpn.example.com'):
+    policy = {'common_name': CsrPolicy.REQUIRED, 'country': CsrPolicy.REQUIRED,
+              'locality': CsrPolicy.REQUIRED}
+    defaults = {'common_name': common_name, 'country': country, 'locality': 'Budapest'}
+    return CsrBuilder(policy, defaults).build_pem(generate_private_key('ec', 256).decode())
+
+
+def test_sign_updates_serial_and_database(make_signer, ca_dir):
+    cert = Cert(make_signer().sign(make_csr_pem()))
+
+    assert int(cert.serial_number) == 0x0f
+    # locality is not in the policy, so it's left out
+    assert cert.subject.common_name == 'vpn.example.com'
+    assert 'locality_name' not in cert.subject.native
+    assert (ca_dir / 'serial').read_text() == '10\n'
+    assert (ca_dir / 'newcerts' / '0F.pem').read_text() == str(cert)
+    status, expiration, revocation, serial, filename, dn = \
+        (ca_dir / 'index.txt').read_text().rstrip('\n').split('\t')
+    assert (status, revocation, serial, filename, dn) == ('V', '', '0F', 'unknown',
+                                                          '/C=HU/CN=vpn.example.com')
+
+    ca_cert = asymmetric.load_certificate(str(ca_dir / 'ca.pem'))
+    asymmetric.ecdsa_verify(ca_cert.public_key, cert.asn1.signature,
+                            cert.asn1['tbs_certificate'].dump(), 'sha256')
+
+
+def test_policy_match(make_signer):
+    with pytest.raises(BackendError, match='country_name'):
+        make_signer().sign(make_csr_pem(country='DE'))
+
+
+def test_unique_subject(make_signer, ca_dir):
+    signer = make_signer(unique_subject='yes')
+    signer.sign(make_csr_pem())
+    with pytest.raises(BackendError, match='already a valid certificate'):
+        signer.sign(make_csr_pem())
+    # the serial number is not used up
+    assert (ca_dir / 'serial').read_text() == '10\n'
+    signer.sign(make_csr_pem(common_name='other.example.com'))
+
+
+def test_extensions(make_signer):
+    signer = make_signer(extensions={'basicconstraints': 'critical,CA:FALSE',
+                                     'keyusage': 'digitalSignature',
+                                     'extendedkeyusage': 'serverAuth'})
+    cert = Cert(signer.sign(make_csr_pem()))
+    assert cert.key_usages == ('digitalSignature',)
+    assert cert.extended_key_usages == ('serverAuth',)
+
+
+def test_unsupported_extension(make_signer):
+    with pytest.raises(BackendError, match='subjectaltname'):
+        make_signer(extensions={'subjectaltname': 'DNS:example.com'})
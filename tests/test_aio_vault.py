@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from aiohttp import web
+from certmaestro.backends.aio_vault import Backend
+from certmaestro.exceptions import BackendError
+
+
+SERIALS = ['1a:2b'] * 20
+
+
+class FakeVault:
+    def __init__(self, cert_pem):
+        self._cert_pem = cert_pem
+        self.revoked = []
+        self.max_concurrent = self._concurrent = 0
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_get('/v1/auth/token/lookup-self', self.lookup_self)
+        app.router.add_get('/v1/pki/certs', self.list_certs)
+        app.router.add_get('/v1/pki/cert/{serial}', self.get_cert)
+        app.router.add_post('/v1/pki/revoke', self.revoke)
+        app.router.add_get('/v1/sys/health', self.health)
+        return app
+
+    async def lookup_self(self, request):
+        if request.headers['X-Vault-Token'] != 'token':
+            return web.json_response({'errors': ['permission denied']}, status=403)
+        return web.json_response({'data': {}})
+
+    async def list_certs(self, request):
+        assert request.query['list'] == 'true'
+        return web.json_response({'data': {'keys': SERIALS}})
+
+    async def get_cert(self, request):
+        self._concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self._concurrent)
+        await asyncio.sleep(0.01)
+        self._concurrent -= 1
+        return web.json_response({'data': {'certificate': self._cert_pem}})
+
+    async def health(self, request):
+        return web.json_response({'version': '1.12.0'})
+
+    async def revoke(self, request):
+        serial = (await request.json())['serial_number']
+        if serial == 'ff':
+            return web.json_response({'errors': ['certificate not found']}, status=400)
+        self.revoked.append(serial)
+        return web.json_response({'data': {'revocation_time': 0}})
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def vault(loop, cert_pem):
+    fake_vault = FakeVault(cert_pem)
+    runner = web.AppRunner(fake_vault.make_app())
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    fake_vault.url = f'http://127.0.0.1:{port}'
+    yield fake_vault
+    loop.run_until_complete(runner.cleanup())
+
+
+def test_invalid_token(loop, vault):
+    async def open_backend():
+        async with Backend(vault.url, 'wrong', 'pki', 'role'):
+            pass
+
+    with pytest.raises(BackendError):
+        loop.run_until_complete(open_backend())
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_list_certs_concurrently(loop, vault, ordered):
+    async def list_certs():
+        async with Backend(vault.url, 'token', 'pki', 'role') as backend:
+            return [c async for c in backend.list_certs(workers=5, ordered=ordered)]
+
+    certs = loop.run_until_complete(list_certs())
+    assert len(certs) == len(SERIALS)
+    assert certs[0].subject.common_name == 'vpn.example.com'
+    assert 1 < vault.max_concurrent <= 5
+
+
+def test_revoke_cert(loop, vault):
+    async def revoke():
+        async with Backend(vault.url, 'token', 'pki', 'role') as backend:
+            await backend.revoke_cert('0x1A2B')
+
+    loop.run_until_complete(revoke())
+    assert vault.revoked == ['1a:2b']
+
+
+def test_revoke_certs(loop, vault):
+    async def revoke():
+        async with Backend(vault.url, 'token', 'pki', 'role') as backend:
+            return [r async for r in backend.revoke_certs(['01', 'ff', '02'], workers=2)]
+
+    results = loop.run_until_complete(revoke())
+    assert sorted(vault.revoked) == ['01', '02']
+    failed, = [r for r in results if not r.succeeded]
+    assert failed.item == 'ff'
+    assert isinstance(failed.error, BackendError)
+
+
+def test_get_version(loop, vault):
+    async def get_version():
+        async with Backend(vault.url, 'token', 'pki', 'role') as backend:
+            return await backend.get_version()
+
+    assert loop.run_until_complete(get_version()) == 'Vault (asyncio) 1.12.0'
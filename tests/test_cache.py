@@ -0,0 +1,60 @@
+import shutil
+from pathlib import Path
+import pytest
+from certmaestro.cache import CertCache, CachedCert
+from certmaestro.wrapper import Cert
+
+
+@pytest.fixture
+def cert_file(tmp_path):
+    path = tmp_path / '1A2B.pem'
+    shutil.copy(str(Path(__file__).parent / 'data' / 'cert.pem'), str(path))
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CertCache(tmp_path / 'cache.sqlite3')
+    yield cache
+    cache.close()
+
+
+def test_first_load_parses_the_file(cache, cert_file):
+    cert, = cache.load_files([cert_file])
+    assert isinstance(cert, Cert)
+
+
+def test_cached_fields_are_the_same(cache, cert_file):
+    cert, = cache.load_files([cert_file])
+    cached, = cache.load_files([cert_file])
+    assert isinstance(cached, CachedCert)
+    assert cached.serial_number == cert.serial_number
+    assert cached.subject.common_name == 'vpn.example.com'
+    assert cached.not_valid_before == cert.not_valid_before
+    assert cached.not_valid_after == cert.not_valid_after
+    # not cached fields are loaded from the file
+    assert cached.signature == cert.signature
+
+
+def test_changed_file_is_parsed_again(cache, cert_file):
+    list(cache.load_files([cert_file]))
+    cert_file.write_text('Some text\n' + cert_file.read_text())
+    cert, = cache.load_files([cert_file])
+    assert isinstance(cert, Cert)
+
+
+def test_clear(cache, cert_file):
+    list(cache.load_files([cert_file]))
+    cache.clear()
+    cert, = cache.load_files([cert_file])
+    assert isinstance(cert, Cert)
+
+
+def test_deleted_file_is_removed(cache, cert_file):
+    other_file = cert_file.with_name('3C4D.pem')
+    shutil.copy(str(cert_file), str(other_file))
+    list(cache.load_files([cert_file, other_file]))
+    other_file.unlink()
+    list(cache.load_files([cert_file]))
+    assert [path for path, *_ in cache._db.execute('SELECT * FROM cert_files')] == \
+        [str(cert_file)]
@@ -0,0 +1,25 @@
+import time
+import pytest
+from certmaestro.concurrency import map_concurrently
+
+
+def _slow_double(number):
+    # earlier items finish later
+    time.sleep((10 - number) / 1000)
+    return number * 2
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_ordered_results(workers):
+    assert list(map_concurrently(_slow_double, range(10), workers)) == \
+        [n * 2 for n in range(10)]
+
+
+def test_unordered_results_contain_everything():
+    results = map_concurrently(_slow_double, range(10), workers=4, ordered=False)
+    assert sorted(results) == [n * 2 for n in range(10)]
+
+
+def test_errors_are_raised():
+    with pytest.raises(ZeroDivisionError):
+        list(map_concurrently(lambda n: 1 / n, [1, 0, 2], workers=2))
@@ -0,0 +1,60 @@
+import asn1crypto.csr as asn1csr
+import asn1crypto.pem as asn1pem
+import pytest
+from oscrypto import asymmetric
+from certmaestro.csr import CsrBuilder, CsrPolicy
+from certmaestro.backends.keypool import generate_private_key
+
+
+@pytest.fixture
+def csr():
+    policy = {
+        'common_name': CsrPolicy.REQUIRED,
+        'country': CsrPolicy.REQUIRED,
+        'state': CsrPolicy.OPTIONAL,
+        'locality': CsrPolicy.REQUIRED,
+        'org_name': CsrPolicy.REQUIRED,
+        'org_unit': CsrPolicy.REQUIRED,
+        'email': CsrPolicy.REQUIRED,
+    }
+    defaults = {
+        'common_name': 'vpn.example.com',
+        'country': 'HU',
+        'state': 'Pest',
+        'locality': 'Budapest',
+        'org_name': None,
+        'org_unit': None,
+        'email': None,
+    }
+    return CsrBuilder(policy, defaults)
+
+
+def test_subject_values(csr):
+    assert csr.subject == '/CN=vpn.example.com/C=HU/L=Budapest'
+    assert csr.subject_values == {
+        'common_name': 'vpn.example.com',
+        'country_name': 'HU',
+        'locality_name': 'Budapest',
+    }
+
+
+@pytest.mark.parametrize('algorithm, bit_size', [('rsa', 2048), ('ec', 256)])
+def test_build_pem(csr, algorithm, bit_size):
+    key_pem = generate_private_key(algorithm, bit_size).decode()
+    csr_pem = csr.build_pem(key_pem)
+
+    _, _, der = asn1pem.unarmor(csr_pem.encode())
+    request = asn1csr.CertificationRequest.load(der)
+    request_info = request['certification_request_info']
+    assert request_info['subject'].native == {
+        'common_name': 'vpn.example.com',
+        'country_name': 'HU',
+        'locality_name': 'Budapest',
+    }
+    private_key = asymmetric.load_private_key(key_pem.encode())
+    assert request_info['subject_pk_info'].dump() == private_key.public_key.asn1.dump()
+
+    public_key = asymmetric.load_public_key(request_info['subject_pk_info'])
+    verify = asymmetric.rsa_pkcs1v15_verify if algorithm == 'rsa' else asymmetric.ecdsa_verify
+    # raises SignatureError if the request is not signed by the key
+    verify(public_key, request['signature'].native, request_info.dump(), 'sha256')
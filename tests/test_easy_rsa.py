@@ -0,0 +1,162 @@
+import stat
+import shutil
+import pytest
+from certmaestro.backends import easy_rsa
+from certmaestro.backends.easy_rsa import Backend
+from certmaestro.backends.keypool import generate_private_key
+from certmaestro.csr import CsrBuilder, CsrPolicy
+from certmaestro.exceptions import BackendError
+
+VARS = '''
+export EASY_RSA="`pwd`"
+export OPENSSL="{openssl}"
+export KEY_CONFIG="$EASY_RSA/openssl.cnf"
+export KEY_DIR="$EASY_RSA/keys"
+export KEY_COUNTRY="{country}"
+echo NOTE: this is printed on stdout
+'''
+
+CONFIG = '''
+[ ca ]
+default_ca = CA_default
+
+[ CA_default ]
+dir = $ENV::KEY_DIR
+certs = $dir
+new_certs_dir = $dir
+database = $dir/index.txt
+certificate = $dir/ca.crt
+private_key = $dir/ca.key
+serial = $dir/serial
+default_days = 10
+default_crl_days = 10
+default_md = sha256
+policy = policy_anything
+
+[ policy_anything ]
+commonName = supplied
+'''
+
+
+@pytest.fixture
+def root_dir(tmp_path, monkeypatch):
+    openssl = shutil.which('openssl')
+    if openssl is None:
+        pytest.skip('openssl is not installed')
+    (tmp_path / 'vars').write_text(VARS.format(openssl=openssl, country='HU'))
+    (tmp_path / 'openssl.cnf').write_text(CONFIG)
+    (tmp_path / 'keys').mkdir()
+    (tmp_path / 'keys' / 'index.txt').write_text('')
+    monkeypatch.setattr(easy_rsa, '_vars_cache', {})
+    return tmp_path
+
+
+@pytest.fixture
+def source_count(monkeypatch):
+    calls = []
+    source_vars = Backend._source_vars
+
+    def counting_source_vars(self):
+        calls.append(self)
+        return source_vars(self)
+
+    monkeypatch.setattr(Backend, '_source_vars', counting_source_vars)
+    return calls
+
+
+def test_vars_are_sourced_once_per_process(root_dir, source_count):
+    backend = Backend(root_dir, cache_vars=False)
+    assert backend._env['KEY_COUNTRY'] == 'HU'
+    assert backend._key_dir == root_dir / 'keys'
+    Backend(root_dir, cache_vars=False)
+    assert len(source_count) == 1
+    assert not (root_dir / Backend.vars_cache_filename).exists()
+
+
+def test_vars_cache_file(root_dir, source_count):
+    Backend(root_dir)
+    cache_file = root_dir / Backend.vars_cache_filename
+    assert stat.S_IMODE(cache_file.stat().st_mode) == 0o600
+
+    # as if it was a new process
+    easy_rsa._vars_cache.clear()
+    backend = Backend(root_dir)
+    assert backend._env['KEY_COUNTRY'] == 'HU'
+    assert len(source_count) == 1
+
+
+def test_changed_vars_are_sourced_again(root_dir, source_count):
+    Backend(root_dir)
+    vars_file = root_dir / 'vars'
+    vars_file.write_text(vars_file.read_text().replace('"HU"', '"DE"'))
+    easy_rsa._vars_cache.clear()
+    backend = Backend(root_dir)
+    assert backend._env['KEY_COUNTRY'] == 'DE'
+    assert len(source_count) == 2
+
+
+@pytest.fixture
+def issued_serials(root_dir, make_ca):
+    key_dir = root_dir / 'keys'
+    make_ca(key_dir / 'ca.crt', key_dir / 'ca.key')
+    (key_dir / 'serial').write_text('01\n')
+
+    backend = Backend(root_dir)
+    signer = backend._openssl_backend._make_signer(backend._openssl_backend._config)
+    serials = []
+    for common_name in ('one.example.com', 'two.example.com', 'three.example.com'):
+        csr = CsrBuilder({'common_name': CsrPolicy.REQUIRED}, {'common_name': common_name})
+        signer.sign(csr.build_pem(generate_private_key('ec', 256).decode()))
+        serials.append(f'{len(serials) + 1:02X}')
+    return serials
+
+
+def test_revoke_certs(root_dir, issued_serials):
+    backend = Backend(root_dir)
+    results = backend.revoke_certs(['01', '03', 'ff'], reason='keyCompromise')
+
+    assert [result.item for result in results] == ['01', '03', 'ff']
+    assert [str(result.value.serial_number) for result in results[:2]] == ['01', '03']
+    assert results[0].value.reason.native == 'key_compromise'
+    assert isinstance(results[2].error, BackendError)
+
+    statuses = [line[0] for line in (root_dir / 'keys' / 'index.txt').read_text().splitlines()]
+    assert statuses == ['R', 'V', 'R']
+    assert len(backend.get_crl()) == 2
+
+    # revoking again is not an error
+    assert backend.revoke_cert('03').serial_number == results[1].value.serial_number
+
+
+def test_revoke_certs_all_failing(root_dir, issued_serials):
+    backend = Backend(root_dir)
+    results = backend.revoke_certs(['ff', 'not-a-serial'])
+    assert all(isinstance(result.error, BackendError) for result in results)
+    # no CRL was generated
+    assert not (root_dir / 'keys' / 'crl.pem').exists()
+
+
+def test_update_crl(root_dir, issued_serials):
+    config_file = root_dir / 'openssl.cnf'
+    config_file.write_text(CONFIG.replace('serial = $dir/serial',
+                                          'serial = $dir/serial\ncrlnumber = $dir/crlnumber'))
+    (root_dir / 'keys' / 'crlnumber').write_text('01\n')
+    backend = Backend(root_dir)
+    crl = backend.update_crl()
+    assert (crl.crl_number, len(crl)) == (1, 0)
+
+    # revoked after the complete CRL was generated
+    with backend._lock:
+        backend._openssl_backend._mark_revoked(['02'])
+    delta_crl = backend.update_crl(delta=True)
+    assert (delta_crl.crl_number, delta_crl.delta_crl_indicator) == (2, 1)
+    assert [str(rc.serial_number) for rc in delta_crl] == ['02']
+    assert (root_dir / 'keys' / 'crl-delta.pem').exists()
+
+
+def test_revoke_certs_with_invalid_database_line(root_dir, issued_serials):
+    index_file = root_dir / 'keys' / 'index.txt'
+    index_file.write_text(index_file.read_text() + 'garbage\n')
+    backend = Backend(root_dir)
+    with pytest.raises(BackendError, match='line 4'):
+        backend.revoke_certs(['01'])
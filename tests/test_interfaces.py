@@ -0,0 +1,68 @@
+import threading
+import pytest
+from certmaestro.backends.interfaces import IBackend
+from certmaestro.csr import CsrBuilder, CsrPolicy
+
+
+class FakeBackend(IBackend):
+    name = 'Fake'
+    description = 'Fake backend for testing'
+    init_requires = ()
+    version = '1.0'
+    threadsafe = True
+
+    def __init__(self, threadsafe):
+        self.threadsafe = threadsafe
+        self.issuing_threads = set()
+        self.closed = False
+
+    def issue_cert(self, csr):
+        self.issuing_threads.add(threading.get_ident())
+        if csr.common_name == 'invalid':
+            raise ValueError('Invalid common name')
+        return f'key-{csr.common_name}', f'cert-{csr.common_name}'
+
+    def close(self):
+        self.closed = True
+
+    def revoke_cert(self, serial):
+        if serial == 'ff':
+            raise ValueError('Certificate not found')
+        return f'revoked-{serial}'
+
+
+def make_csrs(*common_names):
+    policy = {'common_name': CsrPolicy.REQUIRED}
+    return [CsrBuilder(policy, {'common_name': cn}) for cn in common_names]
+
+
+def test_issue_certs_reports_errors_per_item():
+    backend = FakeBackend(threadsafe=True)
+    results = list(backend.issue_certs(make_csrs('a', 'invalid', 'b'), workers=2))
+    succeeded = sorted(r.value for r in results if r.succeeded)
+    assert succeeded == [('key-a', 'cert-a'), ('key-b', 'cert-b')]
+    failed, = [r for r in results if not r.succeeded]
+    assert failed.item.common_name == 'invalid'
+    assert isinstance(failed.error, ValueError)
+
+
+@pytest.mark.parametrize('threadsafe', [True, False])
+def test_issue_certs_respects_threadsafe(threadsafe):
+    backend = FakeBackend(threadsafe)
+    list(backend.issue_certs(make_csrs(*'abcdefgh'), workers=4))
+    assert (threading.get_ident() in backend.issuing_threads) is not threadsafe
+
+
+def test_revoke_certs_reports_errors_per_item():
+    backend = FakeBackend(threadsafe=True)
+    results = list(backend.revoke_certs(['01', 'ff', '02'], workers=2))
+    assert sorted(r.value for r in results if r.succeeded) == ['revoked-01', 'revoked-02']
+    failed, = [r for r in results if not r.succeeded]
+    assert failed.item == 'ff'
+    assert isinstance(failed.error, ValueError)
+
+
+def test_context_manager_closes_backend():
+    with FakeBackend(threadsafe=True) as backend:
+        assert not backend.closed
+    assert backend.closed
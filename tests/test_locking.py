@@ -0,0 +1,50 @@
+import sys
+import threading
+import subprocess
+from certmaestro.locking import FileLock
+
+# exits with 1 if the file is locked by someone else
+TRY_LOCK = '''
+import fcntl, sys
+with open(sys.argv[1], 'a') as f:
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit(1)
+'''
+
+
+def try_lock_from_other_process(path):
+    return subprocess.run([sys.executable, '-c', TRY_LOCK, str(path)]).returncode == 0
+
+
+def test_excludes_other_processes(tmp_path):
+    lock = FileLock(tmp_path / 'index.txt.lock')
+    with lock:
+        assert not try_lock_from_other_process(lock.path)
+    assert try_lock_from_other_process(lock.path)
+
+
+def test_excludes_other_threads(tmp_path):
+    lock = FileLock(tmp_path / 'index.txt.lock')
+    entered = threading.Event()
+
+    def enter():
+        with lock:
+            entered.set()
+
+    with lock:
+        thread = threading.Thread(target=enter)
+        thread.start()
+        assert not entered.wait(0.1)
+    assert entered.wait(5)
+    thread.join()
+
+
+def test_reentrant(tmp_path):
+    lock = FileLock(tmp_path / 'index.txt.lock')
+    with lock:
+        with lock:
+            pass
+        assert not try_lock_from_other_process(lock.path)
+    assert try_lock_from_other_process(lock.path)
@@ -0,0 +1,79 @@
+import json
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import hvac
+import pytest
+from certmaestro.backends.vault import Backend
+
+
+class FakeClient:
+    def __init__(self, serials, cert_pem):
+        self._serials = serials
+        self._cert_pem = cert_pem
+        self.reading_threads = set()
+
+    def list(self, path):
+        return {'data': {'keys': self._serials}}
+
+    def read(self, path):
+        self.reading_threads.add(threading.get_ident())
+        return {'data': {'certificate': self._cert_pem}}
+
+
+@pytest.fixture
+def backend(cert_pem):
+    backend = Backend.__new__(Backend)
+    backend._client = FakeClient(['1a:2b'] * 20, cert_pem)
+    backend.mount_point = 'pki'
+    backend.role = 'test'
+    return backend
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_list_certs_concurrently(backend, ordered):
+    certs = list(backend.list_certs(workers=4, ordered=ordered))
+    assert len(certs) == 20
+    assert all(c.subject.common_name == 'vpn.example.com' for c in certs)
+    assert threading.get_ident() not in backend._client.reading_threads
+
+
+class VaultHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = json.dumps({'data': {'certificate': self.server.cert_pem}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def vault_url(cert_pem):
+    server = HTTPServer(('127.0.0.1', 0), VaultHandler)
+    server.cert_pem = cert_pem
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_pool_stats(vault_url):
+    backend = Backend.__new__(Backend)
+    backend._pool_size = 2
+    backend._session = Backend._make_session(2, keep_alive=True, retries=0, backoff_factor=0)
+    backend._client = hvac.Client(vault_url, 'token', session=backend._session)
+    backend.mount_point = 'pki'
+    for _ in range(3):
+        backend.get_cert('1a:2b')
+    stats = backend.pool_stats
+    assert stats['pool_size'] == 2
+    assert stats['requests'] == 3
+    # keep-alive connection is reused
+    assert stats['opened_connections'] == 1
+    assert stats['idle_connections'] == 1
@@ -1,8 +1,19 @@
 import pytest
-from certmaestro.wrapper import Name
+from pathlib import Path
+from certmaestro.wrapper import Name, Cert, CertBundle, Crl, StreamingCrl, SerialNumber
 import asn1crypto.x509 as asn1x509
 
 
+@pytest.fixture(scope='session')
+def cert_path():
+    return Path(__file__).parent / 'data' / 'cert.pem'
+
+
+@pytest.fixture(scope='session')
+def crl_path():
+    return Path(__file__).parent / 'data' / 'crl.pem'
+
+
 class TestName:
     def test_name_from_str(self):
         long_name = ('/C=HU/ST=Pest megye/L=Budapest/O=Certmaestro/OU=Single/CN=vpn.example.com'
@@ -36,3 +47,115 @@ class TestName:
 
     def test_names_are_equal_with_different_order(self):
         assert Name('/C=HU/L=Budapest/O=asf') == Name('/O=asf/C=HU/L=Budapest')
+
+
+class TestCert:
+    def test_fields(self, cert_path):
+        cert = Cert.from_file(cert_path)
+        assert str(cert.serial_number) == '1a:2b'
+        assert cert.subject.common_name == 'vpn.example.com'
+        assert cert.issuer == cert.subject
+        assert cert.public_key.bit_size == 2048
+        assert cert.public_key.exponent == 65537
+
+    def test_properties_are_computed_once(self, cert_path):
+        cert = Cert.from_file(cert_path)
+        assert cert.subject is cert.subject
+        assert cert.public_key is cert.public_key
+        assert cert.subject.formatted_lines is cert.subject.formatted_lines
+
+    def test_missing_key_usages_are_falsy(self, cert_path):
+        cert = Cert.from_file(cert_path)
+        assert not cert.extended_key_usages
+
+    def test_header_only_has_the_same_fields(self, cert_path):
+        cert = Cert.from_file(cert_path)
+        header_only = Cert.from_file(cert_path, header_only=True)
+        assert header_only.serial_number == cert.serial_number
+        assert header_only.not_valid_before == cert.not_valid_before
+        assert header_only.not_valid_after == cert.not_valid_after
+        assert header_only.subject == cert.subject
+        # everything else is parsed on demand
+        assert header_only.issuer == cert.issuer
+        assert header_only.signature == cert.signature
+
+
+class TestCertBundle:
+    def test_pem_bundle(self, cert_path, tmp_path):
+        pem = cert_path.read_text()
+        bundle_path = tmp_path / 'bundle.pem'
+        bundle_path.write_text(pem + 'Some text between\n' + pem + pem)
+        certs = list(CertBundle(bundle_path))
+        assert len(certs) == 3
+        assert all(c.subject.common_name == 'vpn.example.com' for c in certs)
+        assert str(certs[0]).strip() == pem.strip()
+
+    @pytest.mark.parametrize('header_only', [False, True])
+    def test_der_bundle(self, cert_path, tmp_path, header_only):
+        der = Cert.from_file(cert_path).asn1.dump()
+        bundle_path = tmp_path / 'bundle.der'
+        bundle_path.write_bytes(der * 3)
+        certs = list(CertBundle(bundle_path, header_only=header_only))
+        assert [str(c.serial_number) for c in certs] == ['1a:2b'] * 3
+        assert certs[2].signature == Cert.from_file(cert_path).signature
+
+    def test_empty_bundle(self, tmp_path):
+        bundle_path = tmp_path / 'empty.pem'
+        bundle_path.write_text('')
+        assert list(CertBundle(bundle_path)) == []
+
+
+class TestCrl:
+    def test_iterate(self, crl_path):
+        crl = Crl.from_file(crl_path)
+        assert [str(rc.serial_number) for rc in crl] == ['03', '1a:2b']
+        assert len(crl) == 2
+
+    def test_is_revoked(self, crl_path):
+        crl = Crl.from_file(crl_path)
+        assert crl.is_revoked('03')
+        assert crl.is_revoked('0x1A2B')
+        assert crl.is_revoked(SerialNumber('1a:2b'))
+        assert not crl.is_revoked('04')
+
+    def test_get_revoked(self, crl_path):
+        crl = Crl.from_file(crl_path)
+        assert crl.get_revoked('03').reason.native == 'key_compromise'
+        assert crl.get_revoked('04') is None
+
+
+class TestStreamingCrl:
+    def test_same_as_crl(self, crl_path):
+        crl = Crl.from_file(crl_path)
+        streaming_crl = StreamingCrl.from_file(crl_path)
+        assert streaming_crl.issuer == crl.issuer
+        assert streaming_crl.this_update == crl.this_update
+        assert streaming_crl.next_update == crl.next_update
+        assert [rc.serial_number for rc in streaming_crl] == [rc.serial_number for rc in crl]
+
+    def test_der_file(self, crl_path, tmp_path):
+        der_path = tmp_path / 'crl.der'
+        der_path.write_bytes(StreamingCrl._unarmor(crl_path.read_bytes()))
+        streaming_crl = StreamingCrl.from_file(der_path)
+        assert [str(rc.serial_number) for rc in streaming_crl] == ['03', '1a:2b']
+
+    def test_not_a_crl(self, cert_path):
+        with pytest.raises(ValueError):
+            StreamingCrl.from_pem(cert_path.read_text())
+
+
+class TestSerialNumber:
+    @pytest.mark.parametrize('serial', ['1a2b', '1A2B', '0x1a2b', '1a:2b', '1a-2b', '01a2b'])
+    def test_formats(self, serial):
+        assert str(SerialNumber(serial)) == '1a:2b'
+
+    def test_zero_prefix(self):
+        assert SerialNumber('abc').as_hex() == '0abc'
+        assert SerialNumber('abc').as_hex(prefix=True) == '0x0abc'
+
+    def test_from_int(self):
+        assert SerialNumber.from_int(0x1a2b) == SerialNumber('1a:2b')
+        assert int(SerialNumber('1a:2b')) == 0x1a2b
+
+    def test_hashable(self):
+        assert {SerialNumber('0x1a2b'), SerialNumber('1A:2B')} == {SerialNumber.from_int(0x1a2b)}